@@ -0,0 +1,271 @@
+import argparse, csv, json, os, platform, random, sqlite3, statistics, subprocess, sys, tempfile, time
+from datetime import datetime
+import database
+from database import get_conn, init_db, close_all
+from modules.clustering import CLUSTER_MAX_ZOOM, cell_bounds, cell_range
+from modules.hazard_import import HazardCsvImport, SEVERITIES, STATUSES
+from modules.hazard_map import and_filters, hazard_report, load_clusters, load_viewport, viewport_query
+from modules.inventory import HISTORY_COLUMNS, ITEM_COLUMNS, LOW_STOCK_FILTER, items_report, search_items
+from modules.patrol import INCIDENT_COLUMNS, SHIFTS_SQL, count_month, incident_query, incident_report, month_bounds, month_key, next_day
+from modules.reports import write_csv
+from modules.virtual_list import PAGE_SIZE, page_query
+
+# Headless benchmarks of the tabs' query and export paths. Each one runs the
+# same SQL/report code the frames use (minus the widgets) against a database
+# filled by generate_data.py and records latency, peak RSS and rows/s as JSON.
+# Compare two runs with --compare to spot regressions between commits.
+REPEAT = 5
+EXPORT_REPEAT = 1  # exports and the import are slow on large data; run them once
+IMPORT_ROWS = 20000
+REGRESSION_RATIO = 1.25  # --compare flags a median this much slower than the baseline
+NOISE_FLOOR_S = 0.001  # ...and at least this much slower, so sub-ms jitter is not flagged
+
+
+def _reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM so each benchmark gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource  # POSIX only; ru_maxrss is the whole run's peak (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+    except ImportError:
+        return None
+
+
+def fetch(sql, params=()):
+    return lambda conn: len(conn.execute(sql, params).fetchall())
+
+
+def run_report(report):
+    # PdfReport normally runs on its own thread behind a progress window
+    report.run()
+    msg = report.messages.queue[-1]
+    if msg[0] != "done":
+        raise RuntimeError(f"{report.title}: {msg}")
+    return msg[1]
+
+
+def sample_params(conn):
+    # Representative arguments taken from the data itself
+    p = {}
+    row = conn.execute("SELECT latitude, longitude FROM Hazards WHERE id >= (SELECT MAX(id) FROM Hazards) / 2 "
+                       "AND latitude IS NOT NULL LIMIT 1").fetchone()
+    p["centre"] = row or (0.0, 0.0)
+    p["last_day"] = conn.execute("SELECT MAX(incident_date) FROM Incidents").fetchone()[0] or "2020-01-01"
+    p["item_id"] = conn.execute("SELECT MAX(item_id) / 2 + 1 FROM Items").fetchone()[0] or 1
+    row = conn.execute("SELECT out_date, transaction_id FROM Transactions WHERE transaction_id >= "
+                       "(SELECT MAX(transaction_id) FROM Transactions) / 2 LIMIT 1").fetchone()
+    p["history_cursor"] = list(row) if row else None
+    p["max_hazard_id"] = conn.execute("SELECT IFNULL(MAX(id), 0) FROM Hazards").fetchone()[0]
+    return p
+
+
+def viewport(centre, half_span):
+    lat, lon = centre
+    return (max(lat - half_span, -85.0), min(lat + half_span, 85.0),
+            max(lon - 2 * half_span, -180.0), min(lon + 2 * half_span, 180.0))
+
+
+def benchmarks(p, workdir, import_rows, include_pdf):
+    # [(group, name, repeat count, fn(conn) -> rows handled)]
+    out = lambda name: os.path.join(workdir, name)
+    benches = []
+    add = lambda group, name, fn, repeat=None: benches.append((group, name, repeat, fn))
+
+    # Hazards tab: viewport refresh at three zooms, viewport clusters, exports
+    for label, half_span in (("site", 0.05), ("region", 1.0), ("world", 90.0)):
+        add("hazards", f"refresh_hazards {label}", fetch(*viewport_query(viewport(p["centre"], half_span), [], [])))
+    add("hazards", "refresh_hazards region High",
+        fetch(*viewport_query(viewport(p["centre"], 1.0), ["severity = ?"], ["High"])))
+    # The cells around a viewport sized for the zoom, as refresh_hazards loads them
+    cells = lambda zoom: cell_range(zoom, viewport(p["centre"], 180.0 / 2 ** zoom))
+    for zoom in (2, 8, CLUSTER_MAX_ZOOM):
+        add("hazards", f"load_clusters zoom {zoom}",
+            lambda conn, zoom=zoom: len(load_clusters(conn, zoom, cells(zoom), [], []).cells))
+    add("hazards", "load_viewport region",
+        lambda conn: len(load_viewport(conn, 8, cell_bounds(8, *cells(8)), cells(8), [], [])[0]))
+    add("hazards", "export_csv all", lambda conn: write_csv(conn, out("hazards.csv"),
+        and_filters("SELECT * FROM Hazards WHERE 1", []), []), EXPORT_REPEAT)
+    add("hazards", "export_csv Area Closed", lambda conn: write_csv(conn, out("closed.csv"),
+        and_filters("SELECT * FROM Hazards WHERE 1", ["severity = ?"]), ["Area Closed"]), EXPORT_REPEAT)
+    if include_pdf:
+        add("hazards", "export_pdf Area Closed",
+            lambda conn: run_report(hazard_report(out("closed.pdf"), ["severity = ?"], ["Area Closed"])), EXPORT_REPEAT)
+
+    # Patrols tab: one day's roster and incidents, month calendar marks, exports
+    day = p["last_day"]
+    key = month_key(day)
+    add("patrol", "load_shifts", fetch(SHIFTS_SQL, (day,)))
+    add("patrol", "load_incidents", fetch(*incident_query("incident_id, shift_id, category, description, timestamp",
+                                                          day, next_day(day))))
+    add("patrol", "month counts", lambda conn: len(count_month(conn, key)))
+    add("patrol", "export_inc_csv month", lambda conn: write_csv(conn, out("incidents.csv"),
+        *incident_query(INCIDENT_COLUMNS, *month_bounds(key))), EXPORT_REPEAT)
+    add("patrol", "export_inc_csv all", lambda conn: write_csv(conn, out("incidents_all.csv"),
+        *incident_query(INCIDENT_COLUMNS)), EXPORT_REPEAT)
+    if include_pdf:
+        add("patrol", "export_inc_pdf month",
+            lambda conn: run_report(incident_report(out("incidents.pdf"), *month_bounds(key))), EXPORT_REPEAT)
+
+    # Inventory tab: first page under each sort, search, low stock, history paging
+    for i, (heading, _, _) in enumerate(ITEM_COLUMNS):
+        add("inventory", f"load_items sort {heading}",
+            fetch(*page_query("Items", "item_id", ITEM_COLUMNS, i, False, [], [], None, PAGE_SIZE)))
+    add("inventory", "load_items low stock",
+        fetch(*page_query("Items", "item_id", ITEM_COLUMNS, 0, False, [LOW_STOCK_FILTER], [], None, PAGE_SIZE)))
+    for term in ("radio", "gas mon", "sku-0001"):
+        # search_items memoises; call the undecorated function so every run hits SQLite
+        add("inventory", f"search {term!r}", lambda conn, term=term: len(search_items.__wrapped__(term)))
+    add("inventory", "items count", fetch("SELECT COUNT(*) FROM Items"))
+    out_date = [h for h, _, _ in HISTORY_COLUMNS].index("Out Date")
+    add("inventory", "history first page",
+        fetch(*page_query("Transactions", "transaction_id", HISTORY_COLUMNS, out_date, True, [], [], None, PAGE_SIZE)))
+    if p["history_cursor"]:
+        add("inventory", "history deep page",
+            fetch(*page_query("Transactions", "transaction_id", HISTORY_COLUMNS, out_date, True, [], [],
+                              p["history_cursor"], PAGE_SIZE)))
+    add("inventory", "item history page",
+        fetch(*page_query("Transactions", "transaction_id", HISTORY_COLUMNS, out_date, True,
+                          ["item_id = ?"], [p["item_id"]], None, PAGE_SIZE)))
+    add("inventory", "history count", fetch("SELECT COUNT(*) FROM Transactions"))
+    add("inventory", "export_items_csv", lambda conn: write_csv(conn, out("items.csv"), "SELECT * FROM Items", ()),
+        EXPORT_REPEAT)
+    if include_pdf:
+        add("inventory", "export_items_pdf", lambda conn: run_report(items_report(out("items.pdf"), [], [])),
+            EXPORT_REPEAT)
+
+    # Hazard CSV import; the imported rows are deleted again afterwards
+    if import_rows:
+        path = out("import.csv")
+        write_import_csv(path, import_rows)
+        add("hazards", f"import_csv {import_rows} rows", lambda conn: import_hazards(path), 1)
+    return benches
+
+
+def write_import_csv(path, rows):
+    rng = random.Random("import")
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["latitude", "longitude", "description", "severity", "status", "date_reported"])
+        for i in range(rows):
+            w.writerow([round(rng.uniform(-30, -20), 6), round(rng.uniform(24, 32), 6), f"Imported {i}",
+                        rng.choice(SEVERITIES), rng.choice(STATUSES), f"2030-01-01T00:00:{i % 60:02d}"])
+
+
+def import_hazards(path):
+    job = HazardCsvImport(path, mode="skip")
+    job.run()
+    msg = job.messages.queue[-1]
+    if msg[0] != "done":
+        raise RuntimeError(f"import failed: {msg}")
+    return msg[1]["read"]
+
+
+def measure(fn, conn, repeat):
+    times, rows, peak = [], 0, 0
+    for _ in range(repeat):
+        _reset_peak_rss()
+        started = time.perf_counter()
+        rows = fn(conn)
+        times.append(time.perf_counter() - started)
+        peak = max(peak, peak_rss_kb() or 0)
+    median = statistics.median(times)
+    return {"runs": repeat, "rows": rows,
+            "seconds": {"min": min(times), "median": median, "max": max(times)},
+            "rows_per_s": rows / median if median and rows else None,
+            "peak_rss_kb": peak or None}
+
+
+def metadata(conn, args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    tables = ("Hazards", "Shifts", "Incidents", "Items", "Transactions")
+    return {"commit": commit, "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "db": os.path.abspath(args.db),
+            "db_bytes": os.path.getsize(args.db),
+            "rows": {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables},
+            "repeat": args.repeat}
+
+
+def compare(baseline_path, results, ratio):
+    # Prints median time against the baseline; returns the names that regressed
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressed = []
+    print(f"\n{'benchmark':<45} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for r in results:
+        old = baseline.get(r["name"])
+        if old is None:
+            continue
+        before, now = old["seconds"]["median"], r["seconds"]["median"]
+        change = now / before if before else float("inf")
+        flag = ""
+        if change > ratio and now - before > NOISE_FLOOR_S:
+            flag = "  REGRESSION"; regressed.append(r["name"])
+        print(f"{r['name']:<45} {before * 1000:>10.2f} {now * 1000:>10.2f} {change:>7.2f}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the desktop app's data paths without a display.")
+    parser.add_argument("--db", default=database.DB_FILE, help="database to benchmark (see generate_data.py)")
+    parser.add_argument("--out", default="benchmark.json", help="JSON results file (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs per query benchmark")
+    parser.add_argument("--only", help="run benchmarks whose name or group contains this text")
+    parser.add_argument("--no-pdf", action="store_true", help="skip the PDF exports")
+    parser.add_argument("--import-rows", type=int, default=IMPORT_ROWS, help="0 skips the CSV import")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results to compare medians against")
+    parser.add_argument("--max-ratio", type=float, default=REGRESSION_RATIO,
+                        help="exit non-zero if a median is this many times the baseline's")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist; create it with generate_data.py")
+
+    database.DB_FILE = args.db
+    init_db()
+    conn = get_conn()
+    meta = metadata(conn, args)
+    params = sample_params(conn)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            for group, name, repeat, fn in benchmarks(params, workdir, args.import_rows, not args.no_pdf):
+                if args.only and args.only not in name and args.only != group:
+                    continue
+                result = dict(group=group, name=f"{group}: {name}", **measure(fn, get_conn(), repeat or args.repeat))
+                results.append(result)
+                print(f"{result['name']:<45} {result['seconds']['median'] * 1000:>10.2f} ms "
+                      f"{result['rows']:>9} rows {result['peak_rss_kb'] or 0:>9} KiB")
+    finally:
+        # Leave the database as generated, so the next run measures the same data
+        with get_conn() as conn:
+            conn.execute("DELETE FROM Hazards WHERE id > ?", (params["max_hazard_id"],))
+        close_all()
+
+    with open(args.out, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.out}")
+    if args.compare and compare(args.compare, results, args.max_ratio):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,36 @@
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from modules import metrics
 
 DB_FILE = "safety_app.db"
 
+# Applied to every connection handed out by get_conn(). WAL lets readers run
+# alongside a writer; NORMAL sync is durable enough under WAL.
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-32000",      # ~32 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped I/O
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+]
+# Per-connection prepared statement cache (keyed on the SQL text)
+STATEMENT_CACHE_SIZE = 256
+# Background DB workers: writes are serialised on one thread, reads use a
+# small pool (WAL lets them run alongside the writer)
+READ_WORKERS = 2
+
+_local = threading.local()
+_conns = []
+_conns_lock = threading.Lock()
+_writer = None
+_readers = None
+_executors_lock = threading.Lock()
+
 CREATE_TABLES_SQL = [
     # Hazards
     """
@@ -82,11 +111,530 @@ CREATE_TABLES_SQL = [
     """
 ]
 
+# Indexes backing the filtered/sorted queries in modules/*.py
+CREATE_INDEXES_SQL = [
+    # Hazard filters: severity alone or severity+status, and status alone
+    "CREATE INDEX IF NOT EXISTS idx_hazards_severity_status ON Hazards(severity, status)",
+    "CREATE INDEX IF NOT EXISTS idx_hazards_status_severity ON Hazards(status, severity)",
+    # Roster for a day, already ordered by time slot (covers the select list)
+    "CREATE INDEX IF NOT EXISTS idx_shifts_date_slot ON Shifts(date, time_slot, crew)",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON Incidents(timestamp)",
+    # Outstanding check-outs (covers transaction_id via rowid and item_id)
+    "CREATE INDEX IF NOT EXISTS idx_transactions_status_item ON Transactions(status, item_id)",
+    # Per-item and full history, newest first (covers the history columns)
+    "CREATE INDEX IF NOT EXISTS idx_transactions_item_out ON Transactions(item_id, out_date, person, actual_return_date, status)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_out_date ON Transactions(out_date)",
+]
+
+# R-tree over hazard coordinates so the map can load just the visible area.
+# Triggers keep it in sync with every insert/update/delete on Hazards
+# (including CSV imports); hazards without coordinates are not indexed.
+CREATE_HAZARD_RTREE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS HazardsRtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    """
+    INSERT INTO HazardsRtree (id, min_lat, max_lat, min_lon, max_lon)
+    SELECT id, latitude, latitude, longitude, longitude FROM Hazards
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS hazards_rtree_insert AFTER INSERT ON Hazards
+    WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+    BEGIN
+        INSERT INTO HazardsRtree VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS hazards_rtree_update AFTER UPDATE OF id, latitude, longitude ON Hazards
+    BEGIN
+        DELETE FROM HazardsRtree WHERE id = OLD.id;
+        INSERT INTO HazardsRtree
+        SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+        WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS hazards_rtree_delete AFTER DELETE ON Hazards
+    BEGIN
+        DELETE FROM HazardsRtree WHERE id = OLD.id;
+    END
+    """,
+]
+
+# Natural key used to dedupe/upsert hazards on CSV import
+CREATE_HAZARD_KEY_INDEX_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_hazards_natural_key ON Hazards(latitude, longitude, date_reported)",
+]
+
+# Paged history: (item_id, out_date, transaction_id) matches the keyset order
+# exactly, so each page is an index range read with no sort
+HISTORY_PAGING_SQL = [
+    "DROP INDEX IF EXISTS idx_transactions_item_out",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_item_history ON Transactions(item_id, out_date, transaction_id, person, actual_return_date, status)",
+]
+
+# Full-text index over the searchable item fields (external content on Items,
+# kept in sync by triggers). The default rank weights name and SKU highest.
+CREATE_ITEMS_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ItemsFts USING fts5(
+        name, category, location, supplier, supplier_sku,
+        content='Items', content_rowid='item_id', prefix='2 3'
+    )
+    """,
+    "INSERT INTO ItemsFts(ItemsFts, rank) VALUES('rank', 'bm25(10.0, 4.0, 2.0, 2.0, 8.0)')",
+    "INSERT INTO ItemsFts(ItemsFts) VALUES('rebuild')",
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON Items
+    BEGIN
+        INSERT INTO ItemsFts(rowid, name, category, location, supplier, supplier_sku)
+        VALUES (NEW.item_id, NEW.name, NEW.category, NEW.location, NEW.supplier, NEW.supplier_sku);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON Items
+    BEGIN
+        INSERT INTO ItemsFts(ItemsFts, rowid, name, category, location, supplier, supplier_sku)
+        VALUES ('delete', OLD.item_id, OLD.name, OLD.category, OLD.location, OLD.supplier, OLD.supplier_sku);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_update
+    AFTER UPDATE OF item_id, name, category, location, supplier, supplier_sku ON Items
+    BEGIN
+        INSERT INTO ItemsFts(ItemsFts, rowid, name, category, location, supplier, supplier_sku)
+        VALUES ('delete', OLD.item_id, OLD.name, OLD.category, OLD.location, OLD.supplier, OLD.supplier_sku);
+        INSERT INTO ItemsFts(rowid, name, category, location, supplier, supplier_sku)
+        VALUES (NEW.item_id, NEW.name, NEW.category, NEW.location, NEW.supplier, NEW.supplier_sku);
+    END
+    """,
+]
+
+# Hazard photos live in the content-addressed store (modules/photo_store.py);
+# rows hold the store key, so one file can back any number of hazards
+CREATE_HAZARD_PHOTOS_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS HazardPhotos (
+        hazard_id INTEGER NOT NULL,
+        photo TEXT NOT NULL,
+        PRIMARY KEY (hazard_id, photo)
+    ) WITHOUT ROWID
+    """,
+]
+
+# Incident day as a column so date filters are index range scans instead of
+# DATE(timestamp) over every row; VIRTUAL, so existing rows need no rewrite
+INCIDENT_DATE_SQL = [
+    "ALTER TABLE Incidents ADD COLUMN incident_date TEXT GENERATED ALWAYS AS (date(timestamp)) VIRTUAL",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_date ON Incidents(incident_date, timestamp)",
+    "DROP INDEX IF EXISTS idx_incidents_timestamp",
+]
+
+# Items at or below their reorder threshold, kept current by triggers so
+# "what is low" is an index read, not a scan of the catalog. Check-outs and
+# returns change Items.quantity and are picked up by the update trigger.
+LOW_STOCK_CONDITION = ("typeof({0}.quantity) IN ('integer','real') AND typeof({0}.threshold) IN ('integer','real') "
+                       "AND {0}.quantity <= {0}.threshold")
+LOW_STOCK_INSERT = ("INSERT OR REPLACE INTO LowStock(item_id, supplier, shortfall) "
+                    "SELECT {0}.item_id, IFNULL({0}.supplier,''), {0}.threshold - {0}.quantity WHERE " + LOW_STOCK_CONDITION)
+CREATE_LOW_STOCK_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS LowStock (
+        item_id INTEGER PRIMARY KEY,
+        supplier TEXT NOT NULL,
+        shortfall REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_lowstock_supplier ON LowStock(supplier, item_id)",
+    "INSERT OR REPLACE INTO LowStock(item_id, supplier, shortfall) "
+    "SELECT item_id, IFNULL(supplier,''), threshold - quantity FROM Items WHERE " + LOW_STOCK_CONDITION.format("Items"),
+    f"""
+    CREATE TRIGGER IF NOT EXISTS lowstock_insert AFTER INSERT ON Items
+    BEGIN
+        {LOW_STOCK_INSERT.format("NEW")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS lowstock_update
+    AFTER UPDATE OF item_id, quantity, threshold, supplier ON Items
+    BEGIN
+        DELETE FROM LowStock WHERE item_id = OLD.item_id;
+        {LOW_STOCK_INSERT.format("NEW")};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS lowstock_delete AFTER DELETE ON Items
+    BEGIN
+        DELETE FROM LowStock WHERE item_id = OLD.item_id;
+    END
+    """,
+]
+
+# Named check-out kits (e.g. a crew's radios, gas monitors and harnesses) for
+# the batch check-out window, and a SKU index so scanned labels resolve
+CREATE_KITS_SQL = [
+    "CREATE TABLE IF NOT EXISTS Kits (kit_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    """
+    CREATE TABLE IF NOT EXISTS KitItems (
+        kit_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (kit_id, item_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_items_sku ON Items(supplier_sku)",
+]
+
+
+def iso_shift_dates(conn):
+    # Shifts added before the patrol calendar switched to ISO dates hold its
+    # old default pattern: the short date of the machine's locale, e.g.
+    # 10/18/26 under en_US. Parse them with that same locale (as tkcalendar
+    # picked it) so day and month lookups find them; unparseable text stays.
+    from babel import default_locale
+    from babel.dates import parse_date
+    locale = default_locale()
+    updates = []
+    for shift_id, value in conn.execute(
+            "SELECT shift_id, date FROM Shifts WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"):
+        try:
+            updates.append((parse_date(value, locale=locale).isoformat(), shift_id))
+        except (ValueError, IndexError, TypeError):
+            pass
+    conn.executemany("UPDATE Shifts SET date=? WHERE shift_id=?", updates)
+
+
+SHIFT_DATES_SQL = [iso_shift_dates]
+
+# Ordered schema migrations: MIGRATIONS[n] upgrades user_version n -> n+1.
+# Steps are SQL text or fn(conn) for data fixes SQL can't express.
+# Only ever append; never edit a migration that has shipped.
+MIGRATIONS = [
+    CREATE_TABLES_SQL,
+    CREATE_INDEXES_SQL,
+    CREATE_HAZARD_RTREE_SQL,
+    CREATE_HAZARD_KEY_INDEX_SQL,
+    HISTORY_PAGING_SQL,
+    CREATE_ITEMS_FTS_SQL,
+    CREATE_HAZARD_PHOTOS_SQL,
+    INCIDENT_DATE_SQL,
+    CREATE_LOW_STOCK_SQL,
+    CREATE_KITS_SQL,
+    SHIFT_DATES_SQL,
+]
+
+# Hot-path queries issued by modules/*.py with representative parameters.
+# check_query_plans() fails if any of them scans a table or sorts in a temp
+# B-tree. Deliberate whole-table reads (unfiltered lists, exports) are omitted.
+PLAN_CHECK_QUERIES = [
+    ("hazards by severity",
+     "SELECT id,latitude,longitude,description,severity,status,date_reported FROM Hazards WHERE severity = ?",
+     ("High",)),
+    ("hazards by status",
+     "SELECT id,latitude,longitude,description,severity,status,date_reported FROM Hazards WHERE status = ?",
+     ("Logged",)),
+    ("hazards by severity and status",
+     "SELECT id,latitude,longitude,description,severity,status,date_reported FROM Hazards WHERE severity = ? AND status = ?",
+     ("High", "Logged")),
+    ("hazards in viewport",
+     "SELECT h.id,h.latitude,h.longitude,h.description,h.severity,h.status,h.date_reported "
+     "FROM HazardsRtree r CROSS JOIN Hazards h ON h.id = r.id "
+     "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ? AND severity = ?",
+     (-10, 10, -10, 10, "High")),
+    ("hazard by natural key",
+     "SELECT 1 FROM Hazards WHERE latitude=? AND longitude=? AND date_reported=?",
+     (1.0, 2.0, "2024-01-01T00:00:00")),
+    ("hazard by id", "SELECT * FROM Hazards WHERE id=?", (1,)),
+    ("hazard photos", "SELECT photo FROM HazardPhotos WHERE hazard_id=?", (1,)),
+    ("shifts for a day",
+     "SELECT shift_id, date, time_slot, crew FROM Shifts WHERE date=? ORDER BY time_slot",
+     ("2024-01-01",)),
+    ("incidents for a day",
+     "SELECT incident_id, shift_id, category, description, timestamp FROM Incidents "
+     "WHERE incident_date >= ? AND incident_date < ? ORDER BY incident_date, timestamp",
+     ("2024-01-01", "2024-01-02")),
+    ("month counts",
+     "SELECT 'shift', date, COUNT(*) FROM Shifts WHERE date >= ? AND date < ? GROUP BY date "
+     "UNION ALL "
+     "SELECT 'incident', incident_date, COUNT(*) FROM Incidents "
+     "WHERE incident_date >= ? AND incident_date < ? GROUP BY incident_date",
+     ("2024-01-01", "2024-02-01", "2024-01-01", "2024-02-01")),
+    ("item by id",
+     "SELECT name,category,location,quantity,unit,threshold,supplier,supplier_contact,supplier_sku,unit_cost FROM Items WHERE item_id=?",
+     (1,)),
+    ("outstanding check-outs",
+     "SELECT transaction_id, item_id FROM Transactions WHERE status='out'", ()),
+    ("outstanding check-outs for an item",
+     "SELECT transaction_id FROM Transactions WHERE item_id=? AND status='out' "
+     "ORDER BY out_date, transaction_id LIMIT ?",
+     (1, 5)),
+    ("item by scanned SKU", "SELECT item_id, name FROM Items WHERE supplier_sku=?", ("AB-1",)),
+    ("kit contents",
+     "SELECT k.item_id, i.name, k.quantity FROM Kits CROSS JOIN KitItems k ON k.kit_id = Kits.kit_id "
+     "CROSS JOIN Items i ON i.item_id = k.item_id WHERE Kits.name=? ORDER BY k.item_id",
+     ("Crew",)),
+    ("item history page",
+     "SELECT transaction_id, item_id, person, out_date, actual_return_date, status, out_date, transaction_id "
+     "FROM Transactions WHERE (item_id = ?) AND ((out_date, transaction_id) < (?, ?)) "
+     "ORDER BY out_date DESC, transaction_id DESC LIMIT ?",
+     (1, "2024-01-01", 10, 200)),
+    ("history page",
+     "SELECT transaction_id, item_id, person, out_date, actual_return_date, status, out_date, transaction_id "
+     "FROM Transactions WHERE ((out_date, transaction_id) < (?, ?)) "
+     "ORDER BY out_date DESC, transaction_id DESC LIMIT ?",
+     ("2024-01-01", 10, 200)),
+    ("item search",
+     "SELECT i.item_id,i.name,i.category,i.location,i.quantity,i.unit,i.threshold,i.supplier "
+     "FROM ItemsFts CROSS JOIN Items i ON i.item_id = ItemsFts.rowid "
+     "WHERE ItemsFts MATCH ? ORDER BY ItemsFts.rank LIMIT ?",
+     ('"gas"*', 500)),
+    ("low stock items page",
+     "SELECT item_id, name, category, location, quantity, unit, threshold, supplier, item_id, item_id "
+     "FROM Items WHERE (item_id IN (SELECT item_id FROM LowStock)) AND (item_id > ?) "
+     "ORDER BY item_id ASC, item_id ASC LIMIT ?",
+     (10, 200)),
+    ("items page by id",
+     "SELECT item_id, name, category, location, quantity, unit, threshold, supplier, item_id, item_id "
+     "FROM Items WHERE (item_id > ?) ORDER BY item_id ASC, item_id ASC LIMIT ?",
+     (10, 200)),
+]
+
+
+def get_conn():
+    # One long-lived connection per thread, shared by every frame on that thread
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        # Each connection is only used by its own thread; check_same_thread is
+        # off so close_all() can close worker connections at shutdown
+        conn = sqlite3.connect(DB_FILE, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False, factory=TracedConnection)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
+        with _conns_lock:
+            _conns.append(conn)
+    return conn
+
+
+class TracedCursor(sqlite3.Cursor):
+    # Inside traced() each statement is timed at the cursor: the execute call
+    # plus every fetch or step through its rows, so the caller's own work between
+    # rows is not charged to the SQL. It is recorded once its rows run out, the
+    # cursor is reused or closed, or the traced() block ends. executemany and
+    # executescript count as one statement, however many rows they run.
+    _sql = None
+
+    def _timed(self, method, sql, *args, params=None):
+        self._finish()
+        if not getattr(_local, 'tracing', 0):
+            return method(sql, *args)
+        started = time.perf_counter()
+        try:
+            method(sql, *args)
+        finally:
+            self._sql, self._params, self._ms = sql, params, (time.perf_counter() - started) * 1000
+            _local.cursors.add(self)
+        if self.description is None:
+            self._finish()  # no rows to step through
+        return self
+
+    def execute(self, sql, params=()):
+        return self._timed(super().execute, sql, params, params=params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._timed(super().executemany, sql, seq_of_params)
+
+    def executescript(self, script):
+        return self._timed(super().executescript, script)
+
+    def _step(self, method, *args):
+        if self._sql is None:
+            return method(*args)
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._ms += (time.perf_counter() - started) * 1000
+
+    def fetchone(self):
+        row = self._step(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._step(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._step(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._step(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, params, ms = self._sql, self._params, self._ms
+        self._sql = None
+        _local.cursors.discard(self)
+        # Only execute()'s parameters are logged; executemany's would be every row
+        detail = f"{sql} -- {params!r}" if params and ms >= metrics.SLOW_MS["sql"] else sql
+        metrics.observe("sql", metrics.fingerprint(sql), ms, detail)
+
+
+class TracedConnection(sqlite3.Connection):
+    # Routes conn.execute() and friends through TracedCursor
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+@contextmanager
+def traced():
+    # Time the statements this thread runs inside the block (see TracedCursor)
+    if not getattr(_local, 'tracing', 0):
+        _local.cursors = set()
+    _local.tracing = getattr(_local, 'tracing', 0) + 1
+    try:
+        yield
+    finally:
+        _local.tracing -= 1
+        if not _local.tracing:
+            for cursor in list(_local.cursors):
+                cursor._finish()
+
+
+def close_conn():
+    # Close this thread's connection (worker threads call this before exiting)
+    conn = _local.__dict__.pop('conn', None)
+    if conn is not None:
+        with _conns_lock:
+            _conns.remove(conn)
+        conn.close()
+
+
+def _executors():
+    global _writer, _readers
+    with _executors_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(1, thread_name_prefix="db-write")
+            _readers = ThreadPoolExecutor(READ_WORKERS, thread_name_prefix="db-read")
+        return _writer, _readers
+
+
+def _run_read(fn, args):
+    with traced():
+        return fn(get_conn(), *args)
+
+
+def _run_write(fn, args):
+    conn = get_conn()
+    with traced(), conn:
+        return fn(conn, *args)
+
+
+def db_read(fn, *args):
+    # Run fn(conn, *args) on a reader thread; returns a concurrent.futures.Future
+    return _executors()[1].submit(_run_read, fn, args)
+
+
+def db_write(fn, *args):
+    # Run fn(conn, *args) on the writer thread inside one transaction
+    return _executors()[0].submit(_run_write, fn, args)
+
+
+def query(sql, params=()):
+    # Future of all rows for a read-only statement
+    return db_read(lambda conn: conn.execute(sql, params).fetchall())
+
+
+def execute(sql, params=()):
+    # Future of lastrowid for a single write statement
+    return db_write(lambda conn: conn.execute(sql, params).lastrowid)
+
+
+def shutdown_workers():
+    global _writer, _readers
+    with _executors_lock:
+        for executor in (_writer, _readers):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        _writer = _readers = None
+
+
+def close_all():
+    shutdown_workers()
+    metrics.write_summary()
+    with _conns_lock:
+        for conn in _conns:
+            conn.close()
+        _conns.clear()
+    _local.__dict__.pop('conn', None)
+
+
+def migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, len(MIGRATIONS) + 1):
+        # Each migration and its version bump commit together or not at all
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for step in MIGRATIONS[target - 1]:
+                step(conn) if callable(step) else conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {target}")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    for sql in CREATE_TABLES_SQL:
-        cursor.execute(sql)
-    conn.commit()
-    conn.close()
+    migrate(get_conn())
+
+
+def check_query_plans(conn=None):
+    # Returns a list of (name, plan detail) for every offending query plan
+    conn = conn or get_conn()
+    problems = []
+    for name, sql, params in PLAN_CHECK_QUERIES:
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detail = row[-1]
+            # Virtual tables report constrained lookups as "SCAN ... VIRTUAL TABLE INDEX n:<constraints>"
+            indexed_vtab = re.search(r"VIRTUAL TABLE INDEX \d+:\S", detail)
+            if (detail.startswith("SCAN") and not indexed_vtab) or "TEMP B-TREE" in detail:
+                problems.append((name, detail))
+    return problems
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["check-plans"]:
+        init_db()
+        problems = check_query_plans()
+        for name, detail in problems:
+            print(f"FULL SCAN: {name}: {detail}")
+        print("query plans OK" if not problems else f"{len(problems)} query plan problem(s)")
+        sys.exit(1 if problems else 0)
+    print("usage: python database.py check-plans")
+    sys.exit(2)
@@ -0,0 +1,175 @@
+import argparse, random, time
+from datetime import datetime, timedelta
+import database
+from database import get_conn, init_db, close_all
+from modules.hazard_import import SEVERITIES, STATUSES
+
+# Deterministic synthetic data for benchmarking: the same seed and volumes
+# always produce the same rows, so results are comparable between commits.
+START = datetime(2020, 1, 1)
+CHUNK = 50000  # rows per executemany/commit
+
+PRESETS = {
+    "small": dict(hazards=10000, items=1000, transactions=50000, days=365),
+    "medium": dict(hazards=100000, items=5000, transactions=500000, days=3 * 365),
+    "large": dict(hazards=1000000, items=20000, transactions=5000000, days=5 * 365),
+}
+
+# Hazard sites: (lat, lon) centres the reports cluster around
+SITES = [(-26.20, 28.05), (-25.75, 29.20), (-27.10, 26.70), (-23.90, 29.45), (-28.75, 24.75),
+         (-26.65, 27.95), (-24.60, 30.80), (-29.60, 30.40)]
+HAZARD_WORDS = ["Loose rocks", "Oil spill", "Damaged fence", "Exposed cable", "Unstable bench",
+                "Flooded ramp", "Missing berm", "Dust cloud", "Blocked drain", "Faulty light"]
+AREAS = ["North Pit", "South Pit", "Haul Road", "Crusher", "Workshop", "Tailings Dam", "Main Gate"]
+CATEGORIES = ["Near Miss", "Injury", "Equipment", "Environmental", "Security", "Property Damage"]
+TIME_SLOTS = ["06:00-14:00", "14:00-22:00", "22:00-06:00"]
+ITEM_KINDS = [("Radio", "Comms", "ea"), ("Gas Monitor", "Detection", "ea"), ("Harness", "PPE", "ea"),
+              ("Hard Hat", "PPE", "ea"), ("Cap Lamp", "Lighting", "ea"), ("Self Rescuer", "PPE", "ea"),
+              ("Rope", "Rigging", "m"), ("Shackle", "Rigging", "ea"), ("Diesel", "Fuel", "l"),
+              ("First Aid Kit", "Medical", "ea"), ("Fire Extinguisher", "Safety", "ea"), ("Cone", "Traffic", "ea")]
+SUPPLIERS = [f"Supplier {n:02d}" for n in range(1, 41)]
+PEOPLE = [f"Crew {n:03d}" for n in range(1, 301)]
+
+
+def _iso(dt):
+    return dt.isoformat(timespec='seconds')
+
+
+def _insert(conn, sql, rows, label, total):
+    # Streams generated rows into the table CHUNK at a time
+    done, started, batch = 0, time.perf_counter(), []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == CHUNK:
+            with conn:
+                conn.executemany(sql, batch)
+            done += len(batch); batch = []
+            print(f"\r{label}: {done}/{total}", end="", flush=True)
+    if batch:
+        with conn:
+            conn.executemany(sql, batch)
+        done += len(batch)
+    print(f"\r{label}: {done} rows in {time.perf_counter() - started:.1f}s")
+
+
+def hazards(rng, n, days):
+    span = days * 86400
+    for i in range(n):
+        lat0, lon0 = SITES[rng.randrange(len(SITES))]
+        yield (round(rng.gauss(lat0, 0.15), 6), round(rng.gauss(lon0, 0.15), 6),
+               f"{rng.choice(HAZARD_WORDS)} near {rng.choice(AREAS)}",
+               rng.choices(SEVERITIES, (50, 30, 15, 5))[0], rng.choices(STATUSES, (40, 20, 40))[0],
+               _iso(START + timedelta(seconds=i * span // max(n, 1) + rng.randrange(3600))))
+
+
+def shifts(rng, days, per_day):
+    for d in range(days):
+        day = (START + timedelta(days=d)).date().isoformat()
+        for slot in TIME_SLOTS[:per_day]:
+            yield day, slot, ", ".join(rng.sample(PEOPLE, 4))
+
+
+def incidents(rng, days, per_day, shifts_per_day, first_shift):
+    # first_shift: shift_id before this run's first shift (0 on an empty database)
+    for d in range(days):
+        day = START + timedelta(days=d)
+        for _ in range(rng.randint(0, 2 * per_day)):
+            lat0, lon0 = SITES[rng.randrange(len(SITES))]
+            yield (first_shift + d * shifts_per_day + rng.randint(1, shifts_per_day), rng.choice(CATEGORIES),
+                   f"{rng.choice(HAZARD_WORDS)} reported at {rng.choice(AREAS)}", None,
+                   round(rng.gauss(lat0, 0.1), 6), round(rng.gauss(lon0, 0.1), 6),
+                   _iso(day + timedelta(seconds=rng.randrange(86400))))
+
+
+def items(rng, n, first_item):
+    for i in range(first_item + 1, first_item + n + 1):
+        name, category, unit = ITEM_KINDS[i % len(ITEM_KINDS)]
+        supplier = SUPPLIERS[rng.randrange(len(SUPPLIERS))]
+        yield (f"{name} {i:06d}", category, rng.choice(AREAS), rng.randint(0, 200), unit,
+               rng.randint(1, 20), supplier, f"orders@{supplier.lower().replace(' ', '')}.example",
+               f"SKU-{i:06d}", round(rng.uniform(2, 900), 2))
+
+
+def transactions(rng, n, first_item, n_items, days):
+    # Check-outs spread evenly over the period; the last fortnight's are mostly still out.
+    # Item ids are first_item + 1 .. first_item + n_items
+    span = days * 86400
+    still_out = START + timedelta(days=days - 14)
+    for i in range(n):
+        out = START + timedelta(seconds=i * span // max(n, 1) + rng.randrange(600))
+        person = rng.choice(PEOPLE)
+        if out >= still_out and rng.random() < 0.5:
+            yield (first_item + rng.randint(1, n_items), person, _iso(out),
+                   (out + timedelta(days=7)).date().isoformat(), None, "Issued", None, None, None, "out")
+        else:
+            back = out + timedelta(hours=rng.randint(2, 240))
+            yield (first_item + rng.randint(1, n_items), person, _iso(out),
+                   (out + timedelta(days=7)).date().isoformat(), _iso(back), "Issued", "Returned", None, None,
+                   "returned")
+
+
+def _max_id(conn, table, column):
+    return conn.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}").fetchone()[0]
+
+
+def generate(conn, seed, hazard_count, item_count, transaction_count, days, shifts_per_day, incidents_per_day):
+    # One Random per table, so changing one volume leaves the other tables' rows unchanged.
+    # Ids are assigned from the current maximum, so with --append the dependent
+    # rows point at this run's shifts and items, not at whatever rows come first.
+    _insert(conn, "INSERT INTO Hazards(latitude,longitude,description,severity,status,date_reported) "
+                  "VALUES(?,?,?,?,?,?)",
+            hazards(random.Random(f"{seed}-hazards"), hazard_count, days), "Hazards", hazard_count)
+    first_shift = _max_id(conn, "Shifts", "shift_id")
+    _insert(conn, "INSERT INTO Shifts(date,time_slot,crew) VALUES(?,?,?)",
+            shifts(random.Random(f"{seed}-shifts"), days, shifts_per_day), "Shifts", days * shifts_per_day)
+    _insert(conn, "INSERT INTO Incidents(shift_id,category,description,photo_path,latitude,longitude,timestamp) "
+                  "VALUES(?,?,?,?,?,?,?)",
+            incidents(random.Random(f"{seed}-incidents"), days, incidents_per_day, shifts_per_day, first_shift),
+            "Incidents", f"~{days * incidents_per_day}")
+    first_item = _max_id(conn, "Items", "item_id")
+    _insert(conn, "INSERT INTO Items(name,category,location,quantity,unit,threshold,supplier,supplier_contact,"
+                  "supplier_sku,unit_cost) VALUES(?,?,?,?,?,?,?,?,?,?)",
+            items(random.Random(f"{seed}-items"), item_count, first_item), "Items", item_count)
+    if not item_count:
+        first_item, item_count = 0, max(first_item, 1)  # no new items: use the existing ones
+    _insert(conn, "INSERT INTO Transactions(item_id,person,out_date,expected_return_date,actual_return_date,"
+                  "out_notes,return_notes,out_photo,return_photo,status) VALUES(?,?,?,?,?,?,?,?,?,?)",
+            transactions(random.Random(f"{seed}-transactions"), transaction_count, first_item, item_count, days),
+            "Transactions", transaction_count)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the database with deterministic synthetic data.")
+    parser.add_argument("--db", default=database.DB_FILE, help="database file (default: %(default)s)")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--seed", default="1")
+    parser.add_argument("--hazards", type=int)
+    parser.add_argument("--items", type=int)
+    parser.add_argument("--transactions", type=int)
+    parser.add_argument("--days", type=int, help="days of shifts, incidents and history")
+    parser.add_argument("--shifts-per-day", type=int, default=3, choices=range(1, len(TIME_SLOTS) + 1))
+    parser.add_argument("--incidents-per-day", type=int, default=5, help="average per day")
+    parser.add_argument("--append", action="store_true", help="add to a database that already has data")
+    args = parser.parse_args(argv)
+    volumes = dict(PRESETS[args.preset])
+    for key in volumes:
+        if getattr(args, key) is not None:
+            volumes[key] = getattr(args, key)
+
+    database.DB_FILE = args.db
+    init_db()
+    conn = get_conn()
+    if not args.append and any(conn.execute(f"SELECT 1 FROM {t} LIMIT 1").fetchone()
+                               for t in ("Hazards", "Shifts", "Incidents", "Items", "Transactions")):
+        parser.error(f"{args.db} already has data; use a fresh file or pass --append")
+    try:
+        generate(conn, args.seed, volumes["hazards"], volumes["items"], volumes["transactions"],
+                 volumes["days"], args.shifts_per_day, args.incidents_per_day)
+    finally:
+        close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import tkinter as tk
 from tkinter import ttk
-from database import init_db
+from database import init_db, close_all
 from modules.hazard_map import HazardMapFrame
 from modules.patrol import PatrolFrame
 from modules.inventory import InventoryFrame
@@ -35,3 +35,4 @@ class SafetyApp(tk.Tk):
 if __name__ == "__main__":
     app = SafetyApp()
     app.mainloop()
+    close_all()
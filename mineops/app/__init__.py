@@ -1,13 +1,45 @@
 import os
+import sqlite3
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 # SQLAlchemy database
 
 db = SQLAlchemy()
 migrate = Migrate()
 
+SQLITE_BUSY_TIMEOUT_MS = 15000
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers in every worker run alongside the one writer; writers
+    # queue on busy_timeout instead of failing with "database is locked"
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        for pragma in ('PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL',
+                       f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}'):
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def engine_options(config):
+    # One pooled connection per server thread, with headroom for the upload
+    # pipeline's coordinator threads
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if not uri.startswith('sqlite:///') or uri.endswith((':memory:', 'sqlite:///')):
+        return {}  # in-memory databases use a single shared connection
+    threads = int(config.get('THREADS', 8))
+    return {
+        'pool_size': threads,
+        'max_overflow': 4,
+        'pool_timeout': 30,
+        'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
+
 
 def create_app(test_config=None):
     app = Flask(__name__, instance_relative_config=True)
@@ -15,11 +47,20 @@ def create_app(test_config=None):
         SECRET_KEY='dev',
         SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(app.instance_path, 'mineops.db'),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
-        UPLOAD_FOLDER=os.path.join(app.root_path, 'uploads')
+        UPLOAD_FOLDER=os.path.join(app.root_path, 'uploads'),
+        REPORT_CACHE_DIR=os.path.join(app.instance_path, 'report_cache'),
+        UPLOAD_OFFLOAD=None,  # or 'x-sendfile' / 'x-accel-redirect', see files.py
+        UPLOAD_ACCEL_PREFIX='/protected-uploads/',
     )
 
+    # MINEOPS_* environment variables override the defaults (e.g. MINEOPS_SECRET_KEY)
+    app.config.from_prefixed_env('MINEOPS')
     if test_config:
         app.config.update(test_config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    from .files import OFFLOAD_MODES
+    if app.config['UPLOAD_OFFLOAD'] not in OFFLOAD_MODES:
+        raise ValueError(f"UPLOAD_OFFLOAD must be one of {OFFLOAD_MODES}, not {app.config['UPLOAD_OFFLOAD']!r}")
 
     # ensure instance folder exists
     os.makedirs(app.instance_path, exist_ok=True)
@@ -27,6 +68,9 @@ def create_app(test_config=None):
 
     db.init_app(app)
     migrate.init_app(app, db)
+    from . import metrics, trailcam_pipeline
+    metrics.init_app(app)
+    trailcam_pipeline.init_app(app)
 
     from . import models  # noqa
 
@@ -47,10 +91,47 @@ def create_app(test_config=None):
     def dashboard():
         return render_template('dashboard.html')
 
-    from flask import send_from_directory
+    from flask import abort, redirect, url_for
+    from werkzeug.security import safe_join
+    from .files import send_upload, upload_url
+    from .thumbnails import THUMB_SIZES, make_thumbnail, thumb_url, thumb_version
 
+    # Unversioned links revalidate on every view; versioned ones never do
     @app.route('/uploads/<path:filename>')
     def uploads(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        return send_upload(filename)
+
+    @app.route('/files/<version>/<path:filename>')
+    def versioned_upload(version, filename):
+        if safe_join(app.config['UPLOAD_FOLDER'], filename) is None:
+            abort(404)
+        try:
+            current = thumb_version(filename)
+        except OSError:
+            abort(404)
+        if version != current:
+            return redirect(url_for('versioned_upload', version=current, filename=filename))
+        return send_upload(filename, immutable=True)
+
+    # Thumbnails are made at upload time; older uploads get theirs on first request.
+    # The version in the URL changes with the original, so responses never go stale.
+    @app.route('/thumbs/<size>/<version>/<path:filename>')
+    def thumbnail(size, version, filename):
+        if size not in THUMB_SIZES or safe_join(app.config['UPLOAD_FOLDER'], filename) is None:
+            abort(404)
+        try:
+            current = thumb_version(filename)
+        except OSError:
+            abort(404)
+        if version != current:
+            return redirect(url_for('thumbnail', size=size, version=current, filename=filename))
+        try:
+            rel = make_thumbnail(filename, size, version)
+        except OSError:
+            return redirect(url_for('uploads', filename=filename))  # not an image Pillow can read
+        return send_upload(rel, immutable=True)
+
+    app.jinja_env.globals['thumb_url'] = thumb_url
+    app.jinja_env.globals['upload_url'] = upload_url
 
     return app
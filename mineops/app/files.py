@@ -0,0 +1,48 @@
+import os
+from urllib.parse import quote
+from flask import abort, current_app, request, url_for
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+from .thumbnails import thumb_version
+
+# Uploads and thumbnails go out with a strong ETag (the file's mtime and size),
+# so repeat views revalidate to a 304 and Range requests are honoured. URLs
+# carrying the same version are cached for a year as immutable. With
+# UPLOAD_OFFLOAD set the response is headers only and the front proxy sends
+# the bytes:
+#   'x-sendfile'        Apache mod_xsendfile / lighttpd; absolute path
+#   'x-accel-redirect'  nginx; UPLOAD_ACCEL_PREFIX + the relative path
+IMMUTABLE_MAX_AGE = 31536000
+OFFLOAD_MODES = (None, 'x-sendfile', 'x-accel-redirect')
+
+
+def send_upload(upload, immutable=False, etag=None):
+    # upload: path relative to UPLOAD_FOLDER; etag defaults to its mtime/size version
+    path = safe_join(current_app.config['UPLOAD_FOLDER'], upload)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    mode = current_app.config['UPLOAD_OFFLOAD']
+    response = send_file(path, request.environ, etag=etag or thumb_version(upload),
+                         max_age=IMMUTABLE_MAX_AGE if immutable else None,
+                         use_x_sendfile=mode is not None, conditional=mode is None)
+    if immutable:
+        response.cache_control.immutable = True
+    if mode is None:
+        return response
+    # 304s are answered here; Range requests are left to the proxy, which has the bytes
+    response = response.make_conditional(request.environ)
+    if response.status_code == 304:
+        response.headers.pop('X-Sendfile', None)
+    elif mode == 'x-accel-redirect':
+        del response.headers['X-Sendfile']
+        prefix = current_app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/')
+        response.headers['X-Accel-Redirect'] = f'{prefix}/{quote(upload)}'
+    return response
+
+
+def upload_url(upload):
+    try:
+        version = thumb_version(upload)
+    except OSError:
+        return url_for('uploads', filename=upload)  # missing; let it 404
+    return url_for('versioned_upload', version=version, filename=upload)
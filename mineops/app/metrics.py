@@ -0,0 +1,109 @@
+import hashlib
+import os
+import re
+import time
+from flask import Response, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.wsgi import ClosingIterator
+
+# Request and SQL latency histograms, exposed in Prometheus text format at
+# /metrics. Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py)
+# makes every worker write its values to shared files. Whichever worker answers
+# a scrape then reports the totals for all of them, including exited workers.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_STATEMENT_LABEL = 300
+
+_COLUMNS = re.compile(r'^SELECT .+? FROM ')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES = re.compile(r'(VALUES \(\?\.\.\.\))(?:, \(\?\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+REQUESTS = Histogram('mineops_request_duration_seconds',
+                     'Time from receiving a request to sending the last byte of its response.',
+                     ('endpoint', 'method', 'status'), buckets=BUCKETS)
+STATEMENTS = Histogram('mineops_db_statement_duration_seconds',
+                       'Time spent executing each SQL statement, by statement shape.',
+                       ('statement',), buckets=BUCKETS)
+
+
+def fingerprint(statement):
+    # SQLAlchemy statements already use ? placeholders; fold IN lists and
+    # multi-row VALUES so every batch size shares one series, and drop the
+    # select list, which the FROM/WHERE/ORDER BY that follow make redundant
+    statement = _LIST.sub('(?...)', _SPACE.sub(' ', statement).strip())
+    statement = _COLUMNS.sub('SELECT ... FROM ', _VALUES.sub(r'\1', statement))
+    if len(statement) > MAX_STATEMENT_LABEL:
+        # keep truncated labels distinct
+        digest = hashlib.sha1(statement.encode()).hexdigest()[:8]
+        statement = f'{statement[:MAX_STATEMENT_LABEL - 12]}... #{digest}'
+    return statement
+
+
+# Registered once for every Engine, so each app's database is covered
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append((cursor, time.perf_counter()))
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()[1]
+    STATEMENTS.labels(fingerprint(statement)).observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failing statement never reaches after_cursor_execute; some errors come
+    # before before_cursor_execute did, so only pop an entry for this cursor
+    stack = context.connection.info.get('query_started') if context.connection is not None else None
+    cursor = context.execution_context.cursor if context.execution_context is not None \
+        else getattr(context, 'cursor', None)
+    if stack and cursor is not None and stack[-1][0] is cursor:
+        started = stack.pop()[1]
+        STATEMENTS.labels(fingerprint(context.statement)).observe(time.perf_counter() - started)
+
+
+class RequestTimer:
+    # WSGI middleware: times each request until its response body is fully
+    # sent (streamed CSV exports included), labelled with the Flask endpoint
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        status = ['500']
+
+        def _start_response(status_line, headers, exc_info=None):
+            status[0] = status_line.split(' ', 1)[0]
+            return start_response(status_line, headers, exc_info)
+
+        def _done():
+            REQUESTS.labels(environ.get('mineops.endpoint', 'unmatched'), environ.get('REQUEST_METHOD', ''),
+                            status[0]).observe(time.perf_counter() - started)
+
+        try:
+            body = self.wsgi_app(environ, _start_response)
+        except Exception:
+            _done()
+            raise
+        return ClosingIterator(body, _done)
+
+
+def init_app(app):
+    app.wsgi_app = RequestTimer(app.wsgi_app)
+
+    @app.before_request
+    def _label_request():
+        # Endpoint names keep the label set small (no per-id URLs)
+        request.environ['mineops.endpoint'] = request.endpoint or 'unmatched'
+
+    @app.route('/metrics')
+    def metrics():
+        registry = REGISTRY
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
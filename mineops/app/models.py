@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import event
 from . import db
 
 class Patrol(db.Model):
@@ -9,6 +10,13 @@ class Patrol(db.Model):
     checklist = db.Column(db.Text)
     photo = db.Column(db.String(255))
 
+    # Index lists end in the date so keyset pages (date, id) are range scans;
+    # SQLite appends the rowid id to every index
+    __table_args__ = (
+        db.Index('ix_patrol_date', 'date'),
+        db.Index('ix_patrol_area_date', 'area', 'date'),
+    )
+
 class Hazard(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     location = db.Column(db.String(120))
@@ -18,6 +26,12 @@ class Hazard(db.Model):
     photo = db.Column(db.String(255))
     date_reported = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_hazard_date_reported', 'date_reported'),
+        db.Index('ix_hazard_severity_date_reported', 'severity', 'date_reported'),
+        db.Index('ix_hazard_status_date_reported', 'status', 'date_reported'),
+    )
+
 class Maintenance(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     equipment = db.Column(db.String(120))
@@ -27,9 +41,65 @@ class Maintenance(db.Model):
     photo = db.Column(db.String(255))
     date_reported = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_maintenance_date_reported', 'date_reported'),
+        db.Index('ix_maintenance_done_date_reported', 'done', 'date_reported'),
+    )
+
 class TrailCam(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     location = db.Column(db.String(120))
     filename = db.Column(db.String(255))
     notes = db.Column(db.Text)
     date = db.Column(db.DateTime, default=datetime.utcnow)
+    # Filled in by the upload pipeline (app/trailcam_pipeline.py) from the file itself
+    sha256 = db.Column(db.String(64))
+    taken_at = db.Column(db.DateTime)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    batch_id = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index('ix_trail_cam_sha256', 'sha256', unique=True),  # the pipeline inserts ON CONFLICT DO NOTHING
+        db.Index('ix_trail_cam_date', 'date'),
+        db.Index('ix_trail_cam_location_date', 'location', 'date'),
+    )
+
+class UploadBatch(db.Model):
+    # One multi-file trail cam upload; the pipeline updates the counts as it
+    # goes and the status endpoint reports them
+    id = db.Column(db.Integer, primary_key=True)
+    location = db.Column(db.String(120))
+    notes = db.Column(db.Text)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    duplicates = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+    finished = db.Column(db.DateTime)
+    # Owning server process (host:pid:boot) and its heartbeat (see trailcam_pipeline)
+    owner = db.Column(db.String(120))
+    updated = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TableVersion(db.Model):
+    # Bumped by triggers on every insert/update/delete of `name`; cached
+    # reports are keyed on it
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+VERSIONED_TABLES = ('patrol', 'hazard', 'maintenance', 'trail_cam')
+
+def version_trigger_sql(table):
+    stmts = [f"INSERT OR IGNORE INTO table_version (name, version) VALUES ('{table}', 0)"]
+    for op in ('insert', 'update', 'delete'):
+        stmts.append(f"CREATE TRIGGER IF NOT EXISTS {table}_version_{op} AFTER {op.upper()} ON {table} "
+                     f"BEGIN UPDATE table_version SET version = version + 1 WHERE name = '{table}'; END")
+    return stmts
+
+@event.listens_for(db.metadata, 'after_create')
+def create_version_triggers(target, connection, **kw):
+    # db.create_all() path; migrations create the same triggers
+    for table in VERSIONED_TABLES:
+        for stmt in version_trigger_sql(table):
+            connection.exec_driver_sql(stmt)
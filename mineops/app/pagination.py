@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from flask import request, url_for
+from sqlalchemy import tuple_
+
+PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_date_range(query, column):
+    # ?from=YYYY-MM-DD&to=YYYY-MM-DD, both days inclusive
+    start, end = parse_day(request.args.get('from')), parse_day(request.args.get('to'))
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end + timedelta(days=1))
+    return query
+
+
+def filter_equal(query, column, arg):
+    value = request.args.get(arg)
+    return query.filter(column == value) if value else query
+
+
+def decode_cursor(value):
+    # "<iso datetime>_<id>" -> (datetime, id); anything malformed starts from the top
+    try:
+        date, pk = value.rsplit('_', 1)
+        return datetime.fromisoformat(date), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+class Page:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def is_first(self):
+        return not request.args.get('after')
+
+    def first_url(self):
+        args = {k: v for k, v in request.args.items() if k != 'after'}
+        return url_for(request.endpoint, **args)
+
+    def next_url(self):
+        return url_for(request.endpoint, **dict(request.args.items(), after=self.next_cursor))
+
+
+def keyset_page(query, date_col, id_col):
+    # Newest first, one page past the ?after= cursor. The (date, id) row-value
+    # comparison seeks straight to the page through a date index, so deep pages
+    # cost the same as the first one.
+    per_page = max(1, min(request.args.get('per_page', PER_PAGE, type=int), MAX_PER_PAGE))
+    cursor = decode_cursor(request.args.get('after'))
+    if cursor:
+        query = query.filter(tuple_(date_col, id_col) < cursor)
+    rows = query.order_by(date_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = f'{getattr(last, date_col.key).isoformat()}_{getattr(last, id_col.key)}'
+    return Page(rows, next_cursor)
@@ -3,13 +3,16 @@ from flask import Blueprint, render_template, request, redirect, url_for, curren
 from werkzeug.utils import secure_filename
 from .. import db
 from ..models import Hazard
+from ..pagination import keyset_page, filter_date_range, filter_equal
 
 bp = Blueprint('hazards', __name__)
 
 @bp.route('/')
 def index():
-    hazards = Hazard.query.order_by(Hazard.date_reported.desc()).all()
-    return render_template('hazards/index.html', hazards=hazards)
+    query = filter_date_range(Hazard.query, Hazard.date_reported)
+    query = filter_equal(filter_equal(query, Hazard.severity, 'severity'), Hazard.status, 'status')
+    page = keyset_page(query, Hazard.date_reported, Hazard.id)
+    return render_template('hazards/index.html', hazards=page.items, page=page)
 
 @bp.route('/add', methods=['GET', 'POST'])
 def add():
@@ -3,13 +3,18 @@ from flask import Blueprint, render_template, request, redirect, url_for, curren
 from werkzeug.utils import secure_filename
 from .. import db
 from ..models import Maintenance
+from ..pagination import keyset_page, filter_date_range
 
 bp = Blueprint('maintenance', __name__)
 
 @bp.route('/')
 def index():
-    logs = Maintenance.query.order_by(Maintenance.date_reported.desc()).all()
-    return render_template('maintenance/index.html', logs=logs)
+    query = filter_date_range(Maintenance.query, Maintenance.date_reported)
+    status = request.args.get('status')
+    if status in ('open', 'done'):
+        query = query.filter(Maintenance.done == (status == 'done'))
+    page = keyset_page(query, Maintenance.date_reported, Maintenance.id)
+    return render_template('maintenance/index.html', logs=page.items, page=page)
 
 @bp.route('/add', methods=['GET', 'POST'])
 def add():
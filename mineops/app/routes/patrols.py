@@ -3,13 +3,15 @@ from flask import Blueprint, render_template, request, redirect, url_for, curren
 from werkzeug.utils import secure_filename
 from .. import db
 from ..models import Patrol
+from ..pagination import keyset_page, filter_date_range, filter_equal
 
 bp = Blueprint('patrols', __name__)
 
 @bp.route('/')
 def index():
-    patrols = Patrol.query.order_by(Patrol.date.desc()).all()
-    return render_template('patrols/index.html', patrols=patrols)
+    query = filter_equal(filter_date_range(Patrol.query, Patrol.date), Patrol.area, 'area')
+    page = keyset_page(query, Patrol.date, Patrol.id)
+    return render_template('patrols/index.html', patrols=page.items, page=page)
 
 @bp.route('/add', methods=['GET', 'POST'])
 def add():
@@ -1,10 +1,21 @@
 import csv
+import glob
+import io
 import os
-from flask import Blueprint, current_app, send_file, request, render_template
-from ..models import Patrol, Hazard, Maintenance, TrailCam
+import re
+import threading
+import zlib
+from contextlib import contextmanager, suppress
+from flask import Blueprint, Response, current_app, send_file, request, render_template, stream_with_context
+from ..models import Patrol, Hazard, Maintenance, TrailCam, TableVersion
 from .. import db
 from fpdf import FPDF
 
+try:
+    import fcntl
+except ImportError:  # Windows development server: the thread lock alone
+    fcntl = None
+
 bp = Blueprint('reports', __name__)
 
 @bp.route('/')
@@ -12,60 +23,131 @@ def index():
     return render_template('reports/index.html')
 
 
-def export_csv(model, filename, headers, rows):
-    path = os.path.join(current_app.instance_path, filename)
-    with open(path, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        writer.writerows(rows)
-    return path
+# name -> [(header, column)]; exports select just these columns, never whole ORM objects
+CSV_EXPORTS = {
+    'patrols': [('date', Patrol.date), ('area', Patrol.area), ('notes', Patrol.notes)],
+    'hazards': [('date', Hazard.date_reported), ('location', Hazard.location),
+                ('severity', Hazard.severity), ('status', Hazard.status)],
+    'maintenance': [('date', Maintenance.date_reported), ('equipment', Maintenance.equipment),
+                    ('issue', Maintenance.issue), ('done', Maintenance.done)],
+    'trailcams': [('date', TrailCam.date), ('location', TrailCam.location), ('filename', TrailCam.filename)],
+}
+CSV_BATCH_ROWS = 1000  # rows fetched from SQLite per round trip
+CSV_CHUNK_BYTES = 64 * 1024  # response chunk size before compression
+
+
+def csv_chunks(columns):
+    # Yields the CSV in ~64 KiB pieces; only one batch of rows is held at a time
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([header for header, _ in columns])
+    query = db.session.query(*[col for _, col in columns]).order_by(columns[0][1]).yield_per(CSV_BATCH_ROWS)
+    for row in query:
+        writer.writerow(row)
+        if buf.tell() >= CSV_CHUNK_BYTES:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0); buf.truncate()
+    yield buf.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks):
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = gz.compress(chunk)
+        if data:
+            yield data
+    yield gz.flush()
 
 @bp.route('/<name>.csv')
 def csv_export(name):
-    if name == 'patrols':
-        rows = [(p.date, p.area, p.notes) for p in Patrol.query.all()]
-        path = export_csv(Patrol, 'patrols.csv', ['date','area','notes'], rows)
-    elif name == 'hazards':
-        rows = [(h.date_reported, h.location, h.severity, h.status) for h in Hazard.query.all()]
-        path = export_csv(Hazard, 'hazards.csv', ['date','location','severity','status'], rows)
-    elif name == 'maintenance':
-        rows = [(m.date_reported, m.equipment, m.issue, m.done) for m in Maintenance.query.all()]
-        path = export_csv(Maintenance, 'maintenance.csv', ['date','equipment','issue','done'], rows)
-    elif name == 'trailcams':
-        rows = [(t.date, t.location, t.filename) for t in TrailCam.query.all()]
-        path = export_csv(TrailCam, 'trailcams.csv', ['date','location','filename'], rows)
-    else:
+    columns = CSV_EXPORTS.get(name)
+    if columns is None:
         return 'unknown', 404
-    return send_file(path, as_attachment=True)
+    chunks = csv_chunks(columns)
+    headers = {'Content-Disposition': f'attachment; filename={name}.csv', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.accept_encodings:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype='text/csv', headers=headers)
 
 class PDF(FPDF):
     pass
 
-@bp.route('/<name>.pdf')
-def pdf_export(name):
+# name -> (table, title, columns); one line per row, like the CSV columns
+PDF_REPORTS = {
+    'patrols': ('patrol', 'Patrols', [Patrol.date, Patrol.area, Patrol.notes]),
+    'hazards': ('hazard', 'Hazards', [Hazard.date_reported, Hazard.location, Hazard.severity, Hazard.status]),
+    'maintenance': ('maintenance', 'Maintenance', [Maintenance.date_reported, Maintenance.equipment, Maintenance.issue]),
+    'trailcams': ('trail_cam', 'Trail Cams', [TrailCam.date, TrailCam.location, TrailCam.filename]),
+}
+
+
+def table_version(table):
+    return db.session.query(TableVersion.version).filter_by(name=table).scalar() or 0
+
+
+def build_pdf(title, columns, path):
     pdf = PDF()
     pdf.add_page()
     pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0,10,title, ln=1)
+    for row in db.session.query(*columns).yield_per(CSV_BATCH_ROWS):
+        pdf.cell(0,10,' '.join(str(v) for v in row), ln=1)
+    # Build under a private name and rename, so readers never see a partial file
+    tmp = f'{path}.{os.getpid()}-{threading.get_ident()}.part'
+    pdf.output(tmp)
+    os.replace(tmp, path)
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+@contextmanager
+def build_lock(cache_dir, name):
+    # One builder per report across threads (lock) and server workers (flock
+    # on a lock file); the rest wait and then send what it built
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(name, threading.Lock())
+    with lock, open(os.path.join(cache_dir, f'{name}.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
 
-    if name == 'patrols':
-        pdf.cell(0,10,'Patrols', ln=1)
-        for p in Patrol.query.all():
-            pdf.cell(0,10,f"{p.date} {p.area} {p.notes}", ln=1)
-    elif name == 'hazards':
-        pdf.cell(0,10,'Hazards', ln=1)
-        for h in Hazard.query.all():
-            pdf.cell(0,10,f"{h.date_reported} {h.location} {h.severity} {h.status}", ln=1)
-    elif name == 'maintenance':
-        pdf.cell(0,10,'Maintenance', ln=1)
-        for m in Maintenance.query.all():
-            pdf.cell(0,10,f"{m.date_reported} {m.equipment} {m.issue}", ln=1)
-    elif name == 'trailcams':
-        pdf.cell(0,10,'Trail Cams', ln=1)
-        for t in TrailCam.query.all():
-            pdf.cell(0,10,f"{t.date} {t.location} {t.filename}", ln=1)
-    else:
-        return 'unknown', 404
 
-    path = os.path.join(current_app.instance_path, f'{name}.pdf')
-    pdf.output(path)
-    return send_file(path, as_attachment=True)
+def prune_pdfs(cache_dir, name, version):
+    # Drop only versions older than the one just built; a request that read a
+    # newer table version may have built it already
+    for old in glob.glob(os.path.join(cache_dir, f'{name}-v*.pdf')):
+        m = re.fullmatch(rf'{re.escape(name)}-v(\d+)\.pdf', os.path.basename(old))
+        if m and int(m.group(1)) < version:
+            with suppress(FileNotFoundError):
+                os.remove(old)
+
+@bp.route('/<name>.pdf')
+def pdf_export(name):
+    report = PDF_REPORTS.get(name)
+    if report is None:
+        return 'unknown', 404
+    table, title, columns = report
+    # The table's change counter names the artifact and is its ETag, so a PDF
+    # is rebuilt only after that table has been written to
+    version = table_version(table)
+    etag = f'{name}-v{version}'
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    cache_dir = current_app.config['REPORT_CACHE_DIR']
+    path = os.path.join(cache_dir, f'{etag}.pdf')
+    os.makedirs(cache_dir, exist_ok=True)
+    with build_lock(cache_dir, name):
+        if not os.path.exists(path):
+            build_pdf(title, columns, path)
+            prune_pdfs(cache_dir, name, version)
+        # Opened under the lock: once open, a later prune can't take it away
+        f = open(path, 'rb')
+    response = send_file(f, as_attachment=True, download_name=f'{name}.pdf', etag=etag, conditional=True)
+    if response.status_code == 200:
+        response.content_length = os.fstat(f.fileno()).st_size
+    response.cache_control.no_cache = True  # always revalidate; a match costs one 304
+    return response
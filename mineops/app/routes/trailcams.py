@@ -1,29 +1,90 @@
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, current_app, jsonify, abort
 from werkzeug.utils import secure_filename
 from .. import db
-from ..models import TrailCam
+from ..files import send_upload, upload_url
+from ..models import TrailCam, UploadBatch
+from ..thumbnails import THUMB_SIZES, make_thumbnail, thumb_url
+from ..trailcam_pipeline import start_batch
+from ..pagination import keyset_page, filter_date_range, filter_equal
 
 bp = Blueprint('trailcams', __name__)
 
 @bp.route('/')
 def index():
-    cams = TrailCam.query.order_by(TrailCam.date.desc()).all()
-    return render_template('trailcams/index.html', cams=cams)
+    query = filter_equal(filter_date_range(TrailCam.query, TrailCam.date), TrailCam.location, 'location')
+    page = keyset_page(query, TrailCam.date, TrailCam.id)
+    return render_template('trailcams/index.html', cams=page.items, page=page)
+
+# Photos the pipeline hashed are addressed by their sha256: the URL changes
+# only with the bytes, so it is cached as immutable, and the gallery builds it
+# from the row without touching the disk. Older photos fall back to /files/.
+@bp.route('/photos/<int:cam_id>/<sha256>')
+@bp.route('/photos/<int:cam_id>/<sha256>/<size>')
+def photo(cam_id, sha256, size=None):
+    cam = db.get_or_404(TrailCam, cam_id)
+    if not cam.sha256 or (size is not None and size not in THUMB_SIZES):
+        abort(404)
+    if sha256 != cam.sha256:
+        return redirect(url_for('trailcams.photo', cam_id=cam.id, sha256=cam.sha256, size=size))
+    upload = 'trailcams/' + cam.filename
+    if size is not None:
+        try:
+            upload = make_thumbnail(upload, size, cam.sha256)
+        except OSError:
+            abort(404)
+    return send_upload(upload, immutable=True, etag=cam.sha256)
+
+
+@bp.app_template_global()
+def cam_url(cam, size=None):
+    if cam.sha256:
+        return url_for('trailcams.photo', cam_id=cam.id, sha256=cam.sha256, size=size)
+    upload = 'trailcams/' + cam.filename
+    return thumb_url(upload, size) if size else upload_url(upload)
 
 @bp.route('/add', methods=['GET', 'POST'])
 def add():
     if request.method == 'POST':
-        files = request.files.getlist('photos')
-        for f in files:
+        batch = UploadBatch(location=request.form['location'], notes=request.form.get('notes',''))
+        db.session.add(batch)
+        db.session.flush()
+        # Only save the raw files here; hashing, EXIF and thumbnails run in the pipeline
+        folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'trailcams', str(batch.id))
+        os.makedirs(folder, exist_ok=True)
+        uploads = []
+        for f in request.files.getlist('photos'):
             if not f or not f.filename:
                 continue
-            filename = secure_filename(f.filename)
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'trailcams', filename)
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            f.save(path)
-            cam = TrailCam(location=request.form['location'], filename=filename, notes=request.form.get('notes',''))
-            db.session.add(cam)
+            filename = secure_filename(f.filename) or 'photo'
+            stem, ext = os.path.splitext(filename)
+            n = 1
+            while filename == 'failed' or os.path.exists(os.path.join(folder, filename)):  # failed/ holds undecodable files
+                n += 1; filename = f'{stem}-{n}{ext}'
+            f.save(os.path.join(folder, filename))
+            uploads.append(f'trailcams/{batch.id}/{filename}')
+        batch.total = len(uploads)
         db.session.commit()
-        return redirect(url_for('trailcams.index'))
+        start_batch(current_app._get_current_object(), batch.id, uploads)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(batch_status(batch)), 202, {'Location': url_for('trailcams.upload_status_json', batch_id=batch.id)}
+        return redirect(url_for('trailcams.upload_status', batch_id=batch.id))
     return render_template('trailcams/add.html')
+
+
+def batch_status(batch):
+    return {
+        'id': batch.id, 'total': batch.total, 'processed': batch.processed,
+        'duplicates': batch.duplicates, 'failed': batch.failed,
+        'errors': batch.errors.splitlines() if batch.errors else [],
+        'done': batch.finished is not None,
+    }
+
+@bp.route('/uploads/<int:batch_id>')
+def upload_status(batch_id):
+    batch = db.get_or_404(UploadBatch, batch_id)
+    return render_template('trailcams/status.html', batch=batch)
+
+@bp.route('/uploads/<int:batch_id>.json')
+def upload_status_json(batch_id):
+    return jsonify(batch_status(db.get_or_404(UploadBatch, batch_id)))
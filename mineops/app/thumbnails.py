@@ -0,0 +1,66 @@
+import os
+import threading
+from flask import current_app, url_for
+from PIL import Image, ImageOps
+
+# Longest edge in px for each derived size; the gallery uses small, with
+# medium offered to high-DPI screens via srcset
+THUMB_SIZES = {'small': 320, 'medium': 960}
+THUMB_QUALITY = 80
+THUMB_DIR = 'thumbs'  # under UPLOAD_FOLDER
+
+
+def upload_root(root=None):
+    # Worker processes have no app context and pass UPLOAD_FOLDER explicitly
+    return root or current_app.config['UPLOAD_FOLDER']
+
+
+def thumb_version(upload, root=None):
+    # Changes whenever the original is replaced, so URLs carrying it can be cached forever
+    st = os.stat(os.path.join(upload_root(root), upload))
+    return f'{st.st_mtime_ns:x}{st.st_size:x}'
+
+
+def thumb_path(upload, size, version):
+    # Relative to UPLOAD_FOLDER: thumbs/<size>/<upload dir>/<name>.<version>.jpg
+    stem = os.path.splitext(upload)[0]
+    return os.path.join(THUMB_DIR, size, f'{stem}.{version}.jpg')
+
+
+def _save(img, dest):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # Private name per writer: two requests making the same thumbnail must not share a file
+    tmp = f'{dest}.{os.getpid()}-{threading.get_ident()}.part'
+    img.convert('RGB').save(tmp, 'JPEG', quality=THUMB_QUALITY, optimize=True, progressive=True)
+    os.replace(tmp, dest)
+
+
+def make_thumbnails(upload, sizes=None, version=None, root=None):
+    # Writes any of the thumbnails not on disk yet from a single decode of the
+    # original, largest first; returns {size: relative path}
+    root = upload_root(root)
+    version = version or thumb_version(upload, root)
+    paths = {size: thumb_path(upload, size, version) for size in sizes or THUMB_SIZES}
+    missing = sorted((s for s, rel in paths.items() if not os.path.exists(os.path.join(root, rel))),
+                     key=THUMB_SIZES.get, reverse=True)
+    if missing:
+        edge = THUMB_SIZES[missing[0]]
+        with Image.open(os.path.join(root, upload)) as img:
+            img.draft('RGB', (edge, edge))  # JPEG: decode at reduced scale
+            img = ImageOps.exif_transpose(img)
+            for size in missing:
+                img.thumbnail((THUMB_SIZES[size], THUMB_SIZES[size]))
+                _save(img, os.path.join(root, paths[size]))
+    return paths
+
+
+def make_thumbnail(upload, size, version=None):
+    return make_thumbnails(upload, [size], version)[size]
+
+
+def thumb_url(upload, size='small'):
+    try:
+        version = thumb_version(upload)
+    except OSError:
+        return url_for('uploads', filename=upload)  # original is missing; let it 404 as before
+    return url_for('thumbnail', size=size, version=version, filename=upload)
@@ -0,0 +1,332 @@
+import hashlib
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from PIL import Image
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.sqlite import insert
+from . import db
+from .models import TrailCam, UploadBatch
+from .thumbnails import THUMB_SIZES, make_thumbnails, thumb_path
+
+# Uploads are saved by the request, then hashed, EXIF-parsed and thumbnailed
+# in a process pool; a coordinator thread inserts each batch's rows in bulk
+# and keeps UploadBatch counts current for the status endpoint. A batch is
+# owned by the server process that queued it, whose heartbeat thread keeps
+# `updated` fresh on every batch it owns, queued or running; one whose owner
+# died goes stale and is claimed and resumed by another process.
+WORKERS = int(os.environ.get('MINEOPS_PIPELINE_PROCESSES') or os.cpu_count() or 2)  # per server worker
+INSERT_BATCH = 100  # rows per INSERT/commit
+FLUSH_SECONDS = 10  # ...or sooner, so progress stays current
+HEARTBEAT_SECONDS = 30  # owned batches are touched this often, and stale ones looked for
+STALE_AFTER = timedelta(minutes=2)  # no heartbeat for this long: the batch's process is gone
+MAX_ERRORS = 50  # error lines kept on the batch
+
+EXIF_IFD, GPS_IFD = 0x8769, 0x8825
+DATETIME_ORIGINAL, DATETIME = 36867, 306
+GPS_LAT_REF, GPS_LAT, GPS_LON_REF, GPS_LON = 1, 2, 3, 4
+
+_pool = None
+_pool_lock = threading.Lock()
+_coordinators = ThreadPoolExecutor(2, thread_name_prefix='trailcam-batch')
+_boot_id = uuid.uuid4().hex[:8]  # tells a restarted process from one that reused the pid
+_heartbeat_pid = None
+_heartbeat_lock = threading.Lock()
+
+
+def _process_pool(replace=False):
+    global _pool
+    with _pool_lock:
+        if replace and _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # spawn: forking a threaded web worker can copy held locks into the child
+            _pool = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _degrees(dms, ref):
+    d, m, s = (float(v) for v in dms)
+    value = d + m / 60 + s / 3600
+    return -value if ref in ('S', 'W') else value
+
+
+def read_exif(img):
+    # (capture time, latitude, longitude); any of them None when absent or unparseable
+    exif = img.getexif()
+    taken = exif.get_ifd(EXIF_IFD).get(DATETIME_ORIGINAL) or exif.get(DATETIME)
+    try:
+        taken = datetime.strptime(str(taken).strip('\x00 '), '%Y:%m:%d %H:%M:%S') if taken else None
+    except ValueError:
+        taken = None
+    gps = exif.get_ifd(GPS_IFD)
+    try:
+        lat = _degrees(gps[GPS_LAT], gps.get(GPS_LAT_REF))
+        lon = _degrees(gps[GPS_LON], gps.get(GPS_LON_REF))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        lat = lon = None
+    return taken, lat, lon
+
+
+class BadImage(Exception):
+    # The file itself can't be decoded. Anything else a file's processing raises
+    # (disk, memory, the pool) is the server's problem and never costs the photo.
+    pass
+
+
+class Interrupted(Exception):
+    # Some files hit server errors and were left in place; the batch is released
+    # unfinished so resume_stale_batches() retries them
+    pass
+
+
+def process_upload(root, upload):
+    # Runs in a pool process: validate, hash, read EXIF and build thumbnails
+    path = os.path.join(root, upload)
+    try:
+        with Image.open(path) as img:
+            img.verify()  # raises on truncated/corrupt files
+        with Image.open(path) as img:
+            taken, lat, lon = read_exif(img)
+        sha256 = file_sha256(path)
+        make_thumbnails(upload, version=sha256, root=root)  # content-addressed, see trailcams.photo
+    except MemoryError:
+        raise
+    except OSError as e:
+        if e.errno is not None:
+            raise  # disk or permission trouble; Pillow's decode errors carry no errno
+        raise BadImage(str(e)) from e
+    except Exception as e:
+        raise BadImage(str(e) or type(e).__name__) from e
+    return {'sha256': sha256, 'taken_at': taken, 'latitude': lat, 'longitude': lon}
+
+
+def owner():
+    # This server process, as recorded on the batches it queues
+    return f'{socket.gethostname()}:{os.getpid()}:{_boot_id}'
+
+
+def start_batch(app, batch_id, uploads):
+    # uploads: paths relative to UPLOAD_FOLDER, already on disk. Called within
+    # an app context; the batch is ours, and kept alive, from the moment it queues.
+    db.session.execute(update(UploadBatch).where(UploadBatch.id == batch_id)
+                       .values(owner=owner(), updated=datetime.utcnow()))
+    db.session.commit()
+    _start_heartbeat(app)
+    return _coordinators.submit(_run_batch, app, batch_id, uploads)
+
+
+def _start_heartbeat(app):
+    # One thread per server process (threads don't survive a fork, hence the pid)
+    global _heartbeat_pid
+    with _heartbeat_lock:
+        if _heartbeat_pid == os.getpid():
+            return
+        _heartbeat_pid = os.getpid()
+    threading.Thread(target=_heartbeat, args=(app,), name='trailcam-heartbeat', daemon=True).start()
+
+
+def _heartbeat(app):
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        with app.app_context():
+            try:
+                db.session.execute(
+                    update(UploadBatch).where(UploadBatch.owner == owner(), UploadBatch.finished.is_(None))
+                    .values(updated=datetime.utcnow()))
+                db.session.commit()
+                resume_stale_batches(app)
+            except Exception:
+                app.logger.exception('trail cam heartbeat failed')
+            finally:
+                db.session.remove()
+
+
+def _submit_all(root, uploads):
+    try:
+        return {_process_pool().submit(process_upload, root, upload): upload for upload in uploads}
+    except BrokenProcessPool:
+        # A worker died (e.g. killed while decoding a hostile image); start a fresh pool
+        return {_process_pool(replace=True).submit(process_upload, root, upload): upload for upload in uploads}
+
+
+def _run_batch(app, batch_id, uploads):
+    with app.app_context():
+        try:
+            _process_batch(app.config['UPLOAD_FOLDER'], db.session.get(UploadBatch, batch_id), uploads)
+        except Interrupted as e:
+            db.session.rollback()
+            batch = db.session.get(UploadBatch, batch_id)
+            batch.errors = '\n'.join(((batch.errors or '').splitlines() + [f'will retry: {e}'])[-MAX_ERRORS:])
+            batch.owner = batch.updated = None  # stale at once: the next resume pass picks it up
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            batch = db.session.get(UploadBatch, batch_id)
+            batch.errors = ((batch.errors or '') + f'\nbatch stopped: {e}').strip()
+            batch.finished = datetime.utcnow()
+            db.session.commit()
+            raise
+        finally:
+            db.session.remove()
+
+
+def _results(root, uploads):
+    # (upload, metadata, None) or (upload, None, exception) as each file finishes.
+    # One pool process dying (e.g. on a hostile image) fails every outstanding
+    # future with BrokenProcessPool; those files are retried one at a time in a
+    # fresh pool, so only a file that crashes a process on its own is a BadImage.
+    try:
+        futures = _submit_all(root, uploads)
+    except Exception as e:  # no pool at all
+        for upload in uploads:
+            yield upload, None, e
+        return
+    crashed = []
+    for future in as_completed(futures):
+        try:
+            result = futures[future], future.result(), None
+        except BrokenProcessPool:
+            crashed.append(futures[future])
+            continue
+        except Exception as e:
+            result = futures[future], None, e
+        yield result
+    for upload in crashed:
+        try:
+            result = upload, next(iter(_submit_all(root, [upload]))).result(), None
+        except BrokenProcessPool:
+            result = upload, None, BadImage('crashed the image worker')
+        except Exception as e:
+            result = upload, None, e
+        yield result
+
+
+def _process_batch(root, batch, uploads):
+    # A resumed batch carries on from its stored counts
+    seen = set()
+    rows, errors = [], batch.errors.splitlines() if batch.errors else []
+    counts = {'processed': batch.processed, 'duplicates': batch.duplicates, 'failed': batch.failed}
+    flushed = time.monotonic()
+    interrupted = []
+    for n, (upload, meta, error) in enumerate(_results(root, uploads), 1):
+        if error is not None and not isinstance(error, BadImage):
+            interrupted.append(f'{os.path.basename(upload)}: {error}')
+        elif error is not None:
+            counts['processed'] += 1
+            counts['failed'] += 1
+            errors.append(f'{os.path.basename(upload)}: {error}')
+            _quarantine(root, upload)
+        elif meta['sha256'] in seen:
+            counts['processed'] += 1
+            counts['duplicates'] += 1
+            _discard(root, upload, meta['sha256'])
+        else:
+            counts['processed'] += 1
+            seen.add(meta['sha256'])
+            rows.append(dict(meta, location=batch.location, notes=batch.notes, batch_id=batch.id,
+                             filename=upload.split('/', 1)[1], date=datetime.utcnow()))
+        if len(rows) >= INSERT_BATCH or n == len(uploads) or time.monotonic() - flushed >= FLUSH_SECONDS:
+            rows = _flush(batch, rows, counts, errors, root)
+            flushed = time.monotonic()
+    if interrupted:
+        raise Interrupted(f'{len(interrupted)} files, e.g. {interrupted[0]}')
+    batch.finished = datetime.utcnow()
+    db.session.commit()
+
+
+def _flush(batch, rows, counts, errors, root):
+    # Insert in one statement and publish progress in the same transaction.
+    # The unique sha256 index settles races with other batches: a row that
+    # conflicts is a photo stored already, so its file is a duplicate.
+    if rows:
+        stmt = insert(TrailCam).on_conflict_do_nothing(index_elements=['sha256']).returning(TrailCam.sha256)
+        stored = set(db.session.scalars(stmt, rows))
+        for r in rows:
+            if r['sha256'] not in stored:
+                counts['duplicates'] += 1
+                _discard(root, 'trailcams/' + r['filename'], r['sha256'])
+    batch.processed, batch.duplicates, batch.failed = counts['processed'], counts['duplicates'], counts['failed']
+    batch.errors = '\n'.join(errors[:MAX_ERRORS]) or None
+    batch.updated = datetime.utcnow()
+    db.session.commit()
+    return []
+
+
+def _discard(root, upload, sha256):
+    # Only for confirmed duplicates: the file and its thumbnails, whose content is stored already
+    for rel in [upload] + [thumb_path(upload, size, sha256) for size in THUMB_SIZES]:
+        try:
+            os.remove(os.path.join(root, rel))
+        except OSError:
+            pass
+
+
+def _quarantine(root, upload):
+    # Undecodable files are kept for inspection in trailcams/<batch>/failed/
+    folder, name = os.path.split(upload)
+    os.makedirs(os.path.join(root, folder, 'failed'), exist_ok=True)
+    try:
+        os.replace(os.path.join(root, upload), os.path.join(root, folder, 'failed', name))
+    except FileNotFoundError:
+        pass
+
+
+def _remaining_uploads(root, batch):
+    # Files of the batch still in its folder and not yet stored; duplicates
+    # are deleted and undecodable files moved to failed/ as they are handled
+    folder = os.path.join(root, 'trailcams', str(batch.id))
+    try:
+        names = sorted(e.name for e in os.scandir(folder) if e.is_file())
+    except FileNotFoundError:
+        names = []
+    stored = {f for (f,) in db.session.query(TrailCam.filename).filter_by(batch_id=batch.id)}
+    return [f'trailcams/{batch.id}/{name}' for name in names if f'{batch.id}/{name}' not in stored]
+
+
+def resume_stale_batches(app):
+    # Restart unfinished batches whose owner has stopped beating (or gave them
+    # up). The conditional UPDATE is the claim: when several server processes
+    # look at once, each batch is resumed by exactly one of them.
+    stale = or_(UploadBatch.owner.is_(None), UploadBatch.updated.is_(None),
+                UploadBatch.updated < datetime.utcnow() - STALE_AFTER)
+    ids = [batch_id for (batch_id,) in
+           db.session.query(UploadBatch.id).filter(UploadBatch.finished.is_(None), stale)]
+    for batch_id in ids:
+        claimed = db.session.execute(
+            update(UploadBatch).where(UploadBatch.id == batch_id, UploadBatch.finished.is_(None), stale)
+            .values(owner=owner(), updated=datetime.utcnow())).rowcount
+        db.session.commit()
+        if claimed:
+            batch = db.session.get(UploadBatch, batch_id)
+            uploads = _remaining_uploads(app.config['UPLOAD_FOLDER'], batch)
+            batch.processed = batch.total - len(uploads)
+            db.session.commit()
+            start_batch(app, batch_id, uploads)
+    return ids
+
+
+def init_app(app):
+    @app.before_request
+    def _resume_batches():
+        # Once per server process, on its first request (not at import, so
+        # `flask db upgrade` and other CLI commands never start batches); the
+        # heartbeat thread looks again every HEARTBEAT_SECONDS
+        if _heartbeat_pid != os.getpid():
+            _start_heartbeat(app)
+            resume_stale_batches(app)
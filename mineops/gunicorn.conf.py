@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Production server settings, read by `gunicorn -c gunicorn.conf.py "app:create_app()"`.
+# Each worker process builds its own app via create_app(); threads within a
+# worker share its SQLAlchemy pool (sized from the same MINEOPS_THREADS).
+# Send SIGHUP to the master for a graceful reload: new workers start with
+# fresh code and config while the old ones finish their in-flight requests.
+
+
+def _env(name, default):
+    return type(default)(os.environ.get(f'MINEOPS_{name}', default))
+
+
+bind = _env('BIND', '0.0.0.0:5000')
+workers = _env('WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8))
+worker_class = 'gthread'
+threads = _env('THREADS', 8)
+# Slow PDF builds and large uploads run inside a request; allow them time
+timeout = _env('TIMEOUT', 120)
+graceful_timeout = _env('GRACEFUL_TIMEOUT', 60)
+keepalive = 5
+# No max_requests: each worker runs its own trail cam batches (and a pool of
+# MINEOPS_PIPELINE_PROCESSES), and a graceful exit waits for them. Any still
+# running after graceful_timeout is killed; trailcam_pipeline resumes it later.
+# Heartbeat files on tmpfs; a slow container disk would otherwise look like hung workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = '-'
+errorlog = '-'
+
+# Workers share metric files, so /metrics reports totals for the whole server
+# (see app/metrics.py); must be set before the workers import prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                      os.path.join(worker_tmp_dir or tempfile.gettempdir(), 'mineops-metrics'))
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to this one's counts
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,323 @@
+# Load tests for MineOps. Builds a throwaway app with create_app(test_config)
+# over a synthetic dataset, serves it on a local threaded server and drives
+# each route with a pool of concurrent clients. Per route it reports
+# p50/p95/p99 latency, requests/s and error rate; results are written as JSON
+# and can be compared against a saved baseline:
+#
+#     python loadtest.py --out baselines/main.json
+#     python loadtest.py --compare baselines/main.json
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from PIL import Image
+from sqlalchemy import insert
+from werkzeug.serving import WSGIRequestHandler, make_server
+from app import create_app, db
+from app.models import Hazard, Maintenance, Patrol, TrailCam, UploadBatch
+
+DATASET = {'patrols': 20000, 'hazards': 50000, 'maintenance': 5000, 'trailcams': 5000}
+START = datetime(2023, 1, 1)
+INSERT_BATCH = 5000
+CONCURRENCY = 8
+REQUESTS = 200  # per route
+UPLOAD_FILES = 5  # photos per trail cam upload request
+PIPELINE_TIMEOUT = 300  # seconds to wait for queued uploads to finish processing
+MAX_RATIO = 1.25  # --compare: p95 this much slower, or throughput this much lower, is a regression
+NOISE_FLOOR_MS = 5  # ...but only if p95 also moved by at least this much
+MAX_ERROR_RATE_RISE = 0.01
+
+AREAS = ['Main Gate', 'North Pit', 'South Pit', 'Haul Road', 'Workshop', 'Tailings Dam']
+SEVERITIES = ['Low', 'Medium', 'High']
+STATUSES = ['Logged', 'In Progress', 'Resolved']
+
+
+def _rows(rng, count, make):
+    # Dates spread evenly over the last couple of years, oldest first
+    step = timedelta(days=730) / max(count, 1)
+    return [make(rng, START + step * i) for i in range(count)]
+
+
+def seed(app, sizes, seed_value):
+    # Deterministic dataset; one Random per table
+    makers = {
+        Patrol: ('patrols', lambda rng, d: {'date': d, 'area': rng.choice(AREAS),
+                                            'notes': 'All clear', 'checklist': 'Gate Locked'}),
+        Hazard: ('hazards', lambda rng, d: {'date_reported': d, 'location': rng.choice(AREAS),
+                                            'description': 'Loose rocks', 'severity': rng.choice(SEVERITIES),
+                                            'status': rng.choice(STATUSES)}),
+        Maintenance: ('maintenance', lambda rng, d: {'date_reported': d, 'equipment': 'Generator',
+                                                     'issue': 'Oil change', 'done': rng.random() < 0.7}),
+        TrailCam: ('trailcams', lambda rng, d: {'date': d, 'location': rng.choice(AREAS),
+                                                'filename': f'cam{rng.randrange(10**6):06d}.jpg'}),
+    }
+    with app.app_context():
+        db.create_all()
+        for model, (key, make) in makers.items():
+            rows = _rows(random.Random(f'{seed_value}-{key}'), sizes[key], make)
+            for i in range(0, len(rows), INSERT_BATCH):
+                db.session.execute(insert(model), rows[i:i + INSERT_BATCH])
+            db.session.commit()
+
+
+def jpeg(rng, size=(640, 480)):
+    # A small, unique image so the pipeline's duplicate check never drops it
+    img = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(8):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        img.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + 40, y + 40))
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=85)
+    return buf.getvalue()
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, data in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Scenario:
+    # One route under load; request() returns (method, path, body, headers)
+    # for the n-th request and is called before that request's clock starts
+    def __init__(self, name, path, method='GET', headers=None, body=None, ok=(200,)):
+        self.name, self.path, self.method = name, path, method
+        self.headers, self.body, self.ok = headers or {}, body, ok
+
+    def request(self, n):
+        body, headers = None, dict(self.headers)
+        if self.body:
+            body, content_type = self.body(n)
+            headers['Content-Type'] = content_type
+        return self.method, self.path, body, headers
+
+
+def scenarios(app, upload_files, seed_value):
+    with app.app_context():
+        # A cursor halfway down the hazard list, to show deep pages cost the same
+        mid = db.session.query(Hazard.date_reported, Hazard.id).order_by(Hazard.id).offset(
+            db.session.query(Hazard).count() // 2).first()
+    deep = f'/hazards/?after={mid[0].isoformat()}_{mid[1]}' if mid else '/hazards/'
+    rng_lock, rng = threading.Lock(), random.Random(f'{seed_value}-uploads')
+
+    def upload(n):
+        with rng_lock:
+            images = [jpeg(rng) for _ in range(upload_files)]
+        return multipart({'location': 'North Pit', 'notes': f'load test {n}'},
+                         [('photos', f'img{n}-{i}.jpg', data) for i, data in enumerate(images)])
+
+    return [
+        Scenario('dashboard', '/'),
+        Scenario('hazards.index', '/hazards/'),
+        Scenario('hazards.index severity', '/hazards/?severity=High&status=Logged'),
+        Scenario('hazards.index deep page', deep),
+        Scenario('patrols.index', '/patrols/'),
+        Scenario('trailcams.index', '/trailcams/'),
+        Scenario('reports.csv_export', '/reports/hazards.csv'),
+        Scenario('reports.csv_export gzip', '/reports/hazards.csv', headers={'Accept-Encoding': 'gzip'}),
+        Scenario('reports.pdf_export', '/reports/hazards.pdf'),
+        Scenario('trailcams.add', '/trailcams/add', method='POST', body=upload,
+                 headers={'Accept': 'application/json'}, ok=(202,)),
+    ]
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args):
+        pass  # one access-log line per request would swamp the report
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def run_scenario(port, scenario, concurrency, requests, duration):
+    # Runs `requests` requests (or as many as fit in `duration` seconds) from
+    # `concurrency` client threads; returns the summary dict
+    latencies, statuses, errors = [], {}, []
+    lock = threading.Lock()
+    counter = iter(range(sys.maxsize))
+
+    def worker(deadline):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        try:
+            while True:
+                with lock:
+                    n = next(counter)
+                if (duration and time.perf_counter() > deadline) or (not duration and n >= requests):
+                    return
+                method, path, body, headers = scenario.request(n)
+                started = time.perf_counter()
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    status = response.status
+                    if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                        conn.close()
+                except (OSError, http.client.HTTPException) as e:
+                    status = type(e).__name__
+                    conn.close()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+                    if status not in scenario.ok and len(errors) < 5:
+                        errors.append(f'{method} {path}: {status}')
+        finally:
+            conn.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker, started + (duration or 0))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    total = len(latencies)
+    failed = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) not in scenario.ok)
+    ms = lambda p: round(percentile(latencies, p) * 1000, 2) if latencies else None
+    return {
+        'route': scenario.name, 'method': scenario.method, 'path': scenario.path,
+        'concurrency': concurrency, 'requests': total, 'seconds': round(wall, 3),
+        'throughput_rps': round(total / wall, 2) if wall else None,
+        'p50_ms': ms(50), 'p95_ms': ms(95), 'p99_ms': ms(99),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'error_rate': round(failed / total, 4) if total else 0.0,
+        'statuses': statuses, 'sample_errors': errors,
+    }
+
+
+def drain_pipeline(app, timeout):
+    # Waits for the upload batches queued by trailcams.add to finish processing
+    started = time.perf_counter()
+    with app.app_context():
+        while True:
+            pending = UploadBatch.query.filter(UploadBatch.finished.is_(None)).count()
+            if not pending or time.perf_counter() - started > timeout:
+                break
+            db.session.remove()
+            time.sleep(0.2)
+        batches = UploadBatch.query.all()
+        photos = sum(b.processed for b in batches)
+        failed = sum(b.failed for b in batches)
+    wall = time.perf_counter() - started
+    return {
+        'route': 'trailcams pipeline', 'method': None, 'path': None, 'concurrency': None,
+        'requests': len(batches), 'seconds': round(wall, 3), 'photos': photos,
+        'throughput_rps': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None,
+        'error_rate': round(failed / photos, 4) if photos else 0.0, 'unfinished': pending,
+        'statuses': {}, 'sample_errors': [b.errors for b in batches if b.errors][:5],
+    }
+
+
+def compare(baseline_path, results, max_ratio):
+    # Prints each route against the baseline; returns the routes that regressed
+    with open(baseline_path) as f:
+        baseline = {(r['route'], r['concurrency']): r for r in json.load(f)['results']}
+    regressed = []
+    print(f"\n{'route':<28} {'c':>3} {'p95 base':>9} {'p95 now':>9} {'rps base':>9} {'rps now':>9} {'err now':>8}")
+    for r in results:
+        old = baseline.get((r['route'], r['concurrency']))
+        if old is None or r['p95_ms'] is None or old['p95_ms'] is None:
+            continue
+        slower = r['p95_ms'] > old['p95_ms'] * max_ratio and r['p95_ms'] - old['p95_ms'] >= NOISE_FLOOR_MS
+        lower = old['throughput_rps'] and r['throughput_rps'] < old['throughput_rps'] / max_ratio
+        erroring = r['error_rate'] > old['error_rate'] + MAX_ERROR_RATE_RISE
+        flag = '  REGRESSION' if slower or lower or erroring else ''
+        if flag:
+            regressed.append(r['route'])
+        print(f"{r['route']:<28} {r['concurrency']:>3} {old['p95_ms']:>9.1f} {r['p95_ms']:>9.1f} {old['throughput_rps']:>9.1f} "
+              f"{r['throughput_rps']:>9.1f} {r['error_rate']:>8.2%}{flag}")
+    return regressed
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test MineOps routes on a synthetic dataset.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[CONCURRENCY],
+                        help='client threads; several values run every route at each level')
+    parser.add_argument('--requests', type=int, default=REQUESTS, help='requests per route')
+    parser.add_argument('--duration', type=float, help='seconds per route instead of a request count')
+    parser.add_argument('--routes', nargs='+', help='only routes whose name starts with one of these')
+    parser.add_argument('--upload-files', type=int, default=UPLOAD_FILES, help='photos per trailcams.add request')
+    parser.add_argument('--seed', default='1')
+    for key, count in DATASET.items():
+        parser.add_argument(f'--{key}', type=int, default=count, help=f'rows to seed (default {count})')
+    parser.add_argument('--out', default='loadtest.json', help='results file; keep one as a baseline')
+    parser.add_argument('--compare', metavar='BASELINE', help='earlier results to diff against')
+    parser.add_argument('--max-ratio', type=float, default=MAX_RATIO)
+    args = parser.parse_args(argv)
+
+    sizes = {key: getattr(args, key) for key in DATASET}
+    with tempfile.TemporaryDirectory(prefix='mineops-load-') as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'load.db'),
+            'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+            'REPORT_CACHE_DIR': os.path.join(tmp, 'report_cache'),
+        })
+        started = time.perf_counter()
+        seed(app, sizes, args.seed)
+        print(f'Seeded {sizes} in {time.perf_counter() - started:.1f}s')
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        results = []
+        try:
+            for scenario in scenarios(app, args.upload_files, args.seed):
+                if args.routes and not scenario.name.startswith(tuple(args.routes)):
+                    continue
+                for concurrency in args.concurrency:
+                    result = run_scenario(server.port, scenario, concurrency, args.requests, args.duration)
+                    results.append(result)
+                    print(f"{result['route']:<28} c={concurrency:<3} {result['throughput_rps']:>8.1f} req/s  "
+                          f"p50 {result['p50_ms']:>8.1f}  p95 {result['p95_ms']:>8.1f}  "
+                          f"p99 {result['p99_ms']:>8.1f} ms  errors {result['error_rate']:.2%}")
+            if any(r['route'] == 'trailcams.add' for r in results):
+                result = drain_pipeline(app, PIPELINE_TIMEOUT)
+                results.append(result)
+                print(f"{result['route']:<28} {result['photos']} photos processed {result['seconds']:.1f}s "
+                      f"after the last upload, errors {result['error_rate']:.2%}")
+        finally:
+            server.shutdown()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump({'meta': {'commit': git_commit(), 'started': datetime.now().isoformat(timespec='seconds'),
+                            'python': platform.python_version(), 'platform': platform.platform(),
+                            'dataset': sizes, 'requests': args.requests, 'duration': args.duration,
+                            'upload_files': args.upload_files},
+                   'results': results}, f, indent=2)
+    print(f'Wrote {len(results)} results to {args.out}')
+    if args.compare and compare(args.compare, results, args.max_ratio):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
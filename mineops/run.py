@@ -2,5 +2,6 @@ from app import create_app
 
 app = create_app()
 
+# Development server only; production runs gunicorn (see gunicorn.conf.py)
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
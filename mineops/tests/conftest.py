@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MINEOPS_PIPELINE_PROCESSES', '2')
+
+from app import create_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/mineops.db',
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'REPORT_CACHE_DIR': str(tmp_path / 'report_cache'),
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import Patrol
+from app.pagination import decode_cursor, keyset_page
+
+
+@pytest.fixture
+def patrols(app):
+    # Ten patrols over four timestamps, so pages split ties on the same date
+    with app.app_context():
+        for n in range(10):
+            db.session.add(Patrol(area=f'Area {n}', date=datetime(2024, 5, 1 + n % 4, 6, 30)))
+        db.session.commit()
+        return [(p.date, p.id) for p in Patrol.query]
+
+
+def page(app, query_string):
+    with app.test_request_context('/patrols/' + query_string):
+        result = keyset_page(Patrol.query, Patrol.date, Patrol.id)
+        return [(p.date, p.id) for p in result.items], result.next_cursor
+
+
+def test_decode_cursor_round_trips():
+    assert decode_cursor('2024-05-03T06:30:00_17') == (datetime(2024, 5, 3, 6, 30), 17)
+    assert decode_cursor('2024-05-03T06:30:00.250000_4') == (datetime(2024, 5, 3, 6, 30, 0, 250000), 4)
+
+
+@pytest.mark.parametrize('value', [None, '', 'garbage', '17', '_17', '2024-05-03T06:30:00_',
+                                   '2024-05-03T06:30:00_x', '2024-13-40_3', 'abc_3'])
+def test_malformed_cursor_decodes_to_none(value):
+    assert decode_cursor(value) is None
+
+
+def test_pages_cover_every_row_once_newest_first(app, patrols):
+    seen, cursor = [], None
+    while True:
+        items, cursor = page(app, '?per_page=3' + (f'&after={cursor}' if cursor else ''))
+        seen += items
+        if cursor is None:
+            break
+        assert decode_cursor(cursor) == items[-1]
+    assert seen == sorted(patrols, reverse=True)
+
+
+def test_malformed_cursor_falls_back_to_the_first_page(app, patrols):
+    first = page(app, '?per_page=4')
+    assert page(app, '?per_page=4&after=not-a-cursor') == first
+    assert page(app, '?per_page=4&after=2024-05-03T06:30:00_oops') == first
+
+
+def test_per_page_is_clamped(app, patrols):
+    assert len(page(app, '?per_page=0')[0]) == 1
+    assert len(page(app, '?per_page=5000')[0]) == len(patrols)
+
+
+def test_index_serves_a_malformed_cursor(client, patrols):
+    assert client.get('/patrols/?after=%27;--').status_code == 200
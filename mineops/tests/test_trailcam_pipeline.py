@@ -0,0 +1,97 @@
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from app import db, trailcam_pipeline
+from app.models import TrailCam, UploadBatch
+
+
+def jpeg(color):
+    data = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(data, 'JPEG')
+    data.seek(0)
+    return data
+
+
+def upload(client, files):
+    response = client.post('/trailcams/add', data={'location': 'North pit', 'photos': files},
+                           content_type='multipart/form-data', headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    return response.json['id']
+
+
+def wait(app, batch_id, done=lambda batch: batch.finished is not None):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        with app.app_context():
+            batch = db.session.get(UploadBatch, batch_id)
+            if done(batch):
+                return {k: getattr(batch, k) for k in ('total', 'processed', 'duplicates', 'failed',
+                                                        'errors', 'owner', 'updated', 'finished')}
+        time.sleep(0.1)
+    pytest.fail(f'batch {batch_id} did not finish')
+
+
+def batch_files(app, batch_id, *sub):
+    folder = os.path.join(app.config['UPLOAD_FOLDER'], 'trailcams', str(batch_id), *sub)
+    return sorted(e.name for e in os.scandir(folder) if e.is_file())
+
+
+def test_duplicates_are_deleted_and_bad_files_quarantined(app, client):
+    batch_id = upload(client, [(jpeg('red'), 'a.jpg'), (jpeg('red'), 'b.jpg'), (jpeg('blue'), 'c.jpg'),
+                               (io.BytesIO(b'not an image'), 'd.jpg')])
+    batch = wait(app, batch_id)
+    assert (batch['total'], batch['processed'], batch['duplicates'], batch['failed']) == (4, 4, 1, 1)
+    assert batch['errors'].startswith('d.jpg: ')
+    with app.app_context():
+        stored = sorted(t.filename for t in TrailCam.query)
+    assert len(stored) == 2 and f'{batch_id}/c.jpg' in stored
+    # One of the two reds was stored; the other was deleted, the bad file kept aside
+    assert batch_files(app, batch_id) == sorted(name.split('/')[1] for name in stored)
+    assert batch_files(app, batch_id, 'failed') == ['d.jpg']
+
+
+def test_photos_stored_by_an_earlier_batch_count_as_duplicates(app, client):
+    first = upload(client, [(jpeg('green'), 'a.jpg')])
+    wait(app, first)
+    second = upload(client, [(jpeg('green'), 'again.jpg'), (jpeg('white'), 'new.jpg')])
+    batch = wait(app, second)
+    assert (batch['processed'], batch['duplicates'], batch['failed']) == (2, 1, 0)
+    assert batch_files(app, second) == ['new.jpg']
+    with app.app_context():
+        assert TrailCam.query.count() == 2
+
+
+def test_server_errors_keep_files_for_a_retry(app, client, monkeypatch):
+    def no_pool(root, uploads):
+        raise OSError(24, 'Too many open files')
+    monkeypatch.setattr(trailcam_pipeline, '_submit_all', no_pool)
+    batch_id = upload(client, [(jpeg('red'), 'a.jpg'), (jpeg('blue'), 'b.jpg')])
+    batch = wait(app, batch_id, lambda batch: batch.owner is None)
+    # Not failed and not finished: released for the next resume pass, files untouched
+    assert (batch['processed'], batch['failed'], batch['finished']) == (0, 0, None)
+    assert 'Too many open files' in batch['errors']
+    assert batch_files(app, batch_id) == ['a.jpg', 'b.jpg']
+
+    monkeypatch.undo()
+    with app.app_context():
+        assert trailcam_pipeline.resume_stale_batches(app) == [batch_id]
+    batch = wait(app, batch_id)
+    assert (batch['processed'], batch['duplicates'], batch['failed']) == (2, 0, 0)
+
+
+def test_live_owners_keep_their_batches(app):
+    with app.app_context():
+        batch = UploadBatch(location='x', total=1, owner='other-host:1:abcd')
+        db.session.add(batch)
+        db.session.commit()
+        # Heartbeat still fresh: another process has it, even though nothing is processed yet
+        assert trailcam_pipeline.resume_stale_batches(app) == []
+        batch.updated = batch.updated - trailcam_pipeline.STALE_AFTER * 2
+        db.session.commit()
+        assert trailcam_pipeline.resume_stale_batches(app) == [batch.id]
+    batch = wait(app, batch.id)
+    assert batch['owner'] == trailcam_pipeline.owner()
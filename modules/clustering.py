@@ -0,0 +1,155 @@
+import bisect
+import math
+
+# Grid clustering on Web Mercator tiles: each zoom level splits a 256px tile
+# into CELLS_PER_TILE x CELLS_PER_TILE cells, so a cell at zoom z is exactly
+# four cells at z+1 and the levels nest.
+CELLS_PER_TILE = 4
+CLUSTER_MAX_ZOOM = 14  # above this every hazard gets its own marker
+MAX_LAT = 85.0511
+
+# Higher rank = worse; unknown severities rank lowest
+SEVERITY_RANK = {"Low": 0, "Med": 1, "High": 2, "Area Closed": 3}
+
+
+def mercator(lat, lon):
+    # Normalised Web Mercator position in [0, 1) x [0, 1)
+    lat = max(min(lat, MAX_LAT), -MAX_LAT)
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0
+    return min(max(x, 0.0), 0.999999999), min(max(y, 0.0), 0.999999999)
+
+
+def cell_of(x, y, zoom):
+    n = CELLS_PER_TILE << zoom
+    return int(x * n), int(y * n)
+
+
+def cell_range(zoom, bounds):
+    # (x0, y0, x1, y1): the cells overlapping (min_lat, max_lat, min_lon, max_lon)
+    min_lat, max_lat, min_lon, max_lon = bounds
+    return cell_of(*mercator(max_lat, min_lon), zoom) + cell_of(*mercator(min_lat, max_lon), zoom)
+
+
+def cell_bounds(zoom, x0, y0, x1=None, y1=None):
+    # (min_lat, max_lat, min_lon, max_lon) covering cells x0..x1, y0..y1 whole
+    n = CELLS_PER_TILE << zoom
+    x1, y1 = x0 if x1 is None else x1, y0 if y1 is None else y1
+    lat = lambda y: math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / n))))
+    return (max(lat(y1 + 1), -MAX_LAT), min(lat(y0), MAX_LAT),
+            x0 * 360.0 / n - 180.0, min((x1 + 1) * 360.0 / n - 180.0, 180.0))
+
+
+def expansion_zoom(zoom, extent):
+    # First zoom level above `zoom` at which hazards spread over extent
+    # (min_lat, max_lat, min_lon, max_lon) fall in more than one cell
+    min_lat, max_lat, min_lon, max_lon = extent
+    corners = mercator(max_lat, min_lon), mercator(min_lat, max_lon)
+    for z in range(zoom + 1, CLUSTER_MAX_ZOOM + 1):
+        if cell_of(*corners[0], z) != cell_of(*corners[1], z):
+            return z
+    return CLUSTER_MAX_ZOOM + 1
+
+
+class Cluster:
+    # Aggregates only: a cell stores no hazard ids, just its single hazard's
+    # id as rep while count == 1 (None when not known, after a remove). Most
+    # fine-level cells hold one hazard, so until a second arrives the severity
+    # counts are just that hazard's severity name.
+    __slots__ = ("count", "sum_lat", "sum_lon", "severities", "rep")
+
+    def __init__(self, rep, lat, lon, sev, count=1):
+        self.count = count
+        self.sum_lat = lat
+        self.sum_lon = lon
+        self.severities = sev if count == 1 else {sev: count}
+        self.rep = rep if count == 1 else None
+
+    def add(self, lat, lon, sev, count=1):
+        if not isinstance(self.severities, dict):
+            self.severities = {self.severities: 1}
+        self.count += count
+        self.sum_lat += lat
+        self.sum_lon += lon
+        self.severities[sev] = self.severities.get(sev, 0) + count
+
+    def remove(self, hid, lat, lon, sev):
+        # Only on cells of 2+ (HazardClusterIndex drops a cell's last hazard)
+        self.count -= 1
+        self.sum_lat -= lat
+        self.sum_lon -= lon
+        self.severities[sev] -= 1
+        if not self.severities[sev]:
+            del self.severities[sev]
+        if self.count == 1 or self.rep == hid:
+            self.rep = None
+
+    @property
+    def position(self):
+        return self.sum_lat / self.count, self.sum_lon / self.count
+
+    @property
+    def worst_severity(self):
+        if not isinstance(self.severities, dict):
+            return self.severities
+        return max(self.severities, key=lambda s: SEVERITY_RANK.get(s, -1))
+
+
+class HazardClusterIndex:
+    # Cell aggregates at one zoom level for the whole cells overlapping a
+    # viewport. Loaded from a GROUP BY over the R-tree (see
+    # hazard_map.load_clusters) and kept current hazard by hazard with
+    # add/remove while the filters stay the same. Rows of cells are told
+    # apart by comparing latitudes with their edges, here and in the SQL
+    # alike, so both put a hazard in the same cell.
+    def __init__(self, zoom, cells):
+        self.zoom = zoom
+        self.range = cells  # (x0, y0, x1, y1), as from cell_range()
+        self.cells = {}
+        x0, y0, x1, y1 = cells
+        self.north = cell_bounds(zoom, x0, y0)[1] if y0 else None
+        self.south = cell_bounds(zoom, x0, y1)[0] if y1 < (CELLS_PER_TILE << zoom) - 1 else None
+        self.edges = [cell_bounds(zoom, x0, y)[1] for y in range(y0 + 1, y1 + 1)]  # north to south
+        self._neg_edges = [-lat for lat in self.edges]
+
+    def load(self, rows):
+        # rows: (cell x, cell y, severity, count, sum lat, sum lon, min id)
+        x0, y0, x1, y1 = self.range
+        for cx, cy, sev, count, sum_lat, sum_lon, rep in rows:
+            if not (x0 <= cx <= x1 and y0 <= cy <= y1):
+                continue  # the R-tree's float32 boxes let in hazards just outside
+            cl = self.cells.get((cx, cy))
+            if cl is None:
+                self.cells[(cx, cy)] = Cluster(rep, sum_lat, sum_lon, sev, count)
+            else:
+                cl.add(sum_lat, sum_lon, sev, count)
+
+    def key_of(self, lat, lon):
+        # Cell key for a position, or None outside the indexed cells
+        x0, y0, x1, y1 = self.range
+        cx = int(min(max((lon + 180.0) / 360.0, 0.0), 0.999999999) * (CELLS_PER_TILE << self.zoom))
+        if not x0 <= cx <= x1 or self.north is not None and lat >= self.north \
+                or self.south is not None and lat < self.south:
+            return None
+        return cx, y0 + bisect.bisect_left(self._neg_edges, -lat)  # edges north of lat
+
+    def add(self, hid, lat, lon, sev):
+        key = self.key_of(lat, lon)
+        if key is None:
+            return
+        cl = self.cells.get(key)
+        if cl is None:
+            self.cells[key] = Cluster(hid, lat, lon, sev)
+        else:
+            cl.add(lat, lon, sev)
+
+    def remove(self, hid, lat, lon, sev):
+        # lat/lon/sev must be what the hazard was indexed with
+        key = self.key_of(lat, lon)
+        cl = self.cells.get(key)
+        if cl is None:
+            return
+        if cl.count == 1:
+            del self.cells[key]
+        else:
+            cl.remove(hid, lat, lon, sev)
@@ -0,0 +1,119 @@
+import csv, io, os, queue, threading
+from datetime import datetime
+from database import get_conn, close_conn, traced
+
+SEVERITIES = ("Low", "Med", "High", "Area Closed")
+STATUSES = ("Logged", "In Progress", "Mitigated")
+BATCH_SIZE = 5000
+
+# Import modes for rows whose natural key (latitude, longitude, date_reported)
+# already exists: insert anyway, skip the row, or update the existing hazard.
+MODES = ("insert", "skip", "upsert")
+
+INSERT_SQL = ("INSERT INTO Hazards (latitude,longitude,description,severity,status,date_reported) "
+              "VALUES (?,?,?,?,?,?)")
+INSERT_NEW_SQL = ("INSERT INTO Hazards (latitude,longitude,description,severity,status,date_reported) "
+                  "SELECT ?,?,?,?,?,? WHERE NOT EXISTS "
+                  "(SELECT 1 FROM Hazards WHERE latitude=? AND longitude=? AND date_reported=?)")
+UPDATE_SQL = ("UPDATE Hazards SET description=?,severity=?,status=? "
+              "WHERE latitude=? AND longitude=? AND date_reported=?")
+
+
+def convert_row(row):
+    # CSV dict -> Hazards tuple; raises ValueError with a readable message
+    try:
+        lat, lon = float(row['latitude']), float(row['longitude'])
+    except KeyError as e:
+        raise ValueError(f"missing column {e}")
+    except (TypeError, ValueError):
+        raise ValueError("latitude/longitude must be numbers")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"coordinates out of range: {lat},{lon}")
+    sev = (row.get('severity') or 'Low').strip()
+    if sev not in SEVERITIES:
+        raise ValueError(f"unknown severity {sev!r}")
+    stat = (row.get('status') or 'Logged').strip()
+    if stat not in STATUSES:
+        raise ValueError(f"unknown status {stat!r}")
+    dt = (row.get('date_reported') or '').strip()
+    if dt:
+        try:
+            datetime.fromisoformat(dt)
+        except ValueError:
+            raise ValueError(f"bad date_reported {dt!r}")
+    else:
+        dt = datetime.now().isoformat()
+    return lat, lon, row.get('description') or '', sev, stat, dt
+
+
+class HazardCsvImport(threading.Thread):
+    # Streams a hazard CSV on a worker thread and writes it in batched
+    # transactions. The UI polls `messages` for ("progress", fraction, text),
+    # ("done", counts) or ("failed", message) and may set `cancelled`.
+    def __init__(self, path, mode="skip", batch_size=BATCH_SIZE):
+        super().__init__(daemon=True)
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.path, self.mode, self.batch_size = path, mode, batch_size
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+        self.errors = []  # (line number, message)
+        self.counts = {"read": 0, "inserted": 0, "updated": 0, "skipped": 0, "errors": 0}
+
+    def run(self):
+        try:
+            with traced():
+                self._import()
+            self.messages.put(("done", dict(self.counts)))
+        except Exception as e:
+            self.messages.put(("failed", str(e)))
+        finally:
+            close_conn()
+
+    def _import(self):
+        conn = get_conn()
+        size = os.path.getsize(self.path) or 1
+        with open(self.path, 'rb') as raw:
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''))
+            batch = []
+            for row in reader:
+                if self.cancelled.is_set():
+                    break
+                self.counts["read"] += 1
+                try:
+                    batch.append(convert_row(row))
+                except ValueError as e:
+                    self.counts["errors"] += 1
+                    self.errors.append((reader.line_num, str(e)))
+                if len(batch) >= self.batch_size:
+                    self._write(conn, batch)
+                    batch = []
+                    self.messages.put(("progress", raw.tell() / size, self._status()))
+            if batch and not self.cancelled.is_set():
+                self._write(conn, batch)
+        self.messages.put(("progress", 1.0, self._status()))
+
+    def _status(self):
+        return f"{self.counts['read']} rows read, {self.counts['errors']} errors"
+
+    def _write(self, conn, batch):
+        with conn:
+            c = conn.cursor()
+            updated = 0
+            if self.mode == "upsert":
+                c.executemany(UPDATE_SQL, [(d, s, st, lat, lon, dt) for lat, lon, d, s, st, dt in batch])
+                updated = c.rowcount
+            if self.mode == "insert":
+                c.executemany(INSERT_SQL, batch)
+            else:
+                c.executemany(INSERT_NEW_SQL, [r + (r[0], r[1], r[5]) for r in batch])
+            inserted = c.rowcount
+        self.counts["inserted"] += inserted
+        self.counts["updated"] += updated
+        self.counts["skipped"] += max(len(batch) - inserted - updated, 0)
+
+    def write_error_log(self, path):
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(["line", "error"])
+            w.writerows(self.errors)
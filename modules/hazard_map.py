@@ -1,11 +1,92 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkintermapview import TkinterMapView
-import sqlite3, os, csv
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+from tkintermapview.utility_functions import osm_to_decimal
+import os, csv
 from datetime import datetime
-from database import DB_FILE
+from database import db_read, execute, query
+from modules.clustering import (CELLS_PER_TILE, CLUSTER_MAX_ZOOM, MAX_LAT, HazardClusterIndex,
+                                cell_bounds, cell_range, expansion_zoom)
+from modules.hazard_import import HazardCsvImport
+from modules.jobs import watch_job, when_done
+from modules.photo_store import store_photo_async
+from modules.reports import PdfReport, run_pdf_report, write_csv
+
+# Extra area loaded around the visible map, as a fraction of the visible span
+VIEWPORT_MARGIN = 0.25
+# Delay before re-querying after the user pans/zooms (ms)
+VIEWPORT_DEBOUNCE_MS = 250
+# Cluster marker (circle, outline) colours by worst severity
+SEVERITY_COLORS = {
+    "Low": ("#66bb6a", "#2e7d32"),
+    "Med": ("#ffb74d", "#ef6c00"),
+    "High": ("#e57373", "#c62828"),
+    "Area Closed": ("#616161", "#212121"),
+}
+
+
+HAZARD_COLUMNS = "h.id,h.latitude,h.longitude,h.description,h.severity,h.status,h.date_reported"
+
+
+def and_filters(sql, filters):
+    return sql + " AND " + " AND ".join(filters) if filters else sql
+
+
+def viewport_query(bounds, filters, params, columns=HAZARD_COLUMNS):
+    # Hazards inside (min_lat, max_lat, min_lon, max_lon), driven by the R-tree
+    sql = ("SELECT " + columns + " FROM HazardsRtree r CROSS JOIN Hazards h ON h.id = r.id "
+           "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?")
+    min_lat, max_lat, min_lon, max_lon = bounds
+    return and_filters(sql, filters), [min_lat, max_lat, min_lon, max_lon] + list(params)
+
+
+def load_clusters(conn, zoom, cells, filters, params):
+    # Aggregates of the cells (x0, y0, x1, y1) around the viewport only,
+    # grouped in SQL: one row per cell and severity
+    index = HazardClusterIndex(zoom, cells)
+    x0, y0, x1, y1 = cells
+    # Cells as in HazardClusterIndex.key_of: x from the longitude, y by
+    # counting the row edges north of the latitude
+    columns = ("CAST(MIN(MAX((h.longitude + 180.0) / 360.0, 0.0), 0.999999999) * ? AS INTEGER) AS cx,"
+               "?" + " + (h.latitude < ?)" * len(index.edges) + " AS cy,"
+               "h.severity,COUNT(*),SUM(h.latitude),SUM(h.longitude),MIN(h.id)")
+    edge_filters, edge_params = [], []
+    if index.north is not None:
+        edge_filters.append("h.latitude < ?"); edge_params.append(index.north)
+    if index.south is not None:
+        edge_filters.append("h.latitude >= ?"); edge_params.append(index.south)
+    sql, params = viewport_query(cell_bounds(zoom, *cells), edge_filters + filters, edge_params + list(params), columns)
+    index.load(conn.execute(sql + " GROUP BY cx, cy, h.severity HAVING cx BETWEEN ? AND ?",
+                            [CELLS_PER_TILE << zoom, y0] + index.edges + params + [x0, x1]))
+    return index
+
+
+def load_viewport(conn, zoom, bounds, cells, filters, params):
+    # Listed rows and, unless cells is None, their clusters, from one snapshot
+    conn.execute("BEGIN")
+    try:
+        rows = conn.execute(*viewport_query(bounds, filters, params)).fetchall()
+        index = load_clusters(conn, zoom, cells, filters, params) if cells else None
+    finally:
+        conn.commit()
+    return rows, index
+
+
+def extent_query(zoom, key, filters, params):
+    # (min_lat, max_lat, min_lon, max_lon) of the hazards in one cell
+    bounds = cell_bounds(zoom, *key)
+    return viewport_query(bounds, ["h.latitude BETWEEN ? AND ?", "h.longitude BETWEEN ? AND ?"] + filters,
+                          list(bounds) + list(params),
+                          "MIN(h.latitude),MAX(h.latitude),MIN(h.longitude),MAX(h.longitude)")
+
+
+def hazard_report(path, filters, params):
+    sql = and_filters("SELECT id,description,severity,status,date_reported FROM Hazards WHERE 1", filters)
+    return PdfReport(
+        path, "Hazard Report",
+        [("ID", 0.6), ("Description", 3.4), ("Severity", 1), ("Status", 1), ("Date", 1)],
+        sql + " ORDER BY id", params,
+        format_row=lambda r: (r[0], (r[1] or '')[:60], r[2], r[3], (r[4] or '').split('T')[0]))
 
 
 class HazardMapFrame(ttk.Frame):
@@ -23,6 +104,22 @@ class HazardMapFrame(ttk.Frame):
         self.map_widget.pack(fill='both', expand=True)
         self.map_widget.add_left_click_map_command(self.on_map_left_click)
         self.paned.add(map_frame)
+        # TkinterMapView has no pan/zoom callback, so watch the canvas events
+        # that move the view and re-query once the user stops.
+        self._viewport_job = None
+        # Drawn state: listed rows and single-hazard markers keyed by hazard id
+        # (tree iid is str(id)), cluster markers keyed by (zoom, cell x, cell y);
+        # clusters covers the loaded bounds at the loaded zoom (None above
+        # CLUSTER_MAX_ZOOM)
+        self._rows = {}
+        self._markers = {}
+        self._cluster_markers = {}
+        self.clusters = None
+        self._loaded_bounds = None
+        self._loaded_zoom = None
+        self._refresh_seq = 0
+        for seq in ("<ButtonRelease-1>", "<MouseWheel>", "<Button-4>", "<Button-5>", "<Configure>"):
+            self.map_widget.canvas.bind(seq, self.schedule_viewport_refresh, add='+')
 
         # Control frame
         ctrl_frame = ttk.Frame(self.paned, width=400)
@@ -51,7 +148,7 @@ class HazardMapFrame(ttk.Frame):
         )
         cmb_stat.pack(side='left', padx=5)
 
-        ttk.Button(filter_frame, text="Apply Filters", command=self.refresh_hazards).pack(side='left', padx=5)
+        ttk.Button(filter_frame, text="Apply Filters", command=self.apply_filters).pack(side='left', padx=5)
 
         # List of hazards
         cols = ("ID","Description","Severity","Status","Date")
@@ -72,75 +169,217 @@ class HazardMapFrame(ttk.Frame):
         # Load initial hazards
         self.refresh_hazards()
 
-    def db_connect(self):
-        return sqlite3.connect(DB_FILE)
+    def filter_conditions(self):
+        # Bound parameters keep the SQL text stable so the statement cache hits
+        filters, params = [], []
+        if self.sev_var.get() != "All":
+            filters.append("severity = ?"); params.append(self.sev_var.get())
+        if self.stat_var.get() != "All":
+            filters.append("status = ?"); params.append(self.stat_var.get())
+        return filters, params
+
+    def viewport_bounds(self, margin=0.0):
+        # (min_lat, max_lat, min_lon, max_lon) of the visible map, grown by margin
+        mw = self.map_widget
+        zoom = round(mw.zoom)
+        max_lat, min_lon = osm_to_decimal(*mw.upper_left_tile_pos, zoom)
+        min_lat, max_lon = osm_to_decimal(*mw.lower_right_tile_pos, zoom)
+        dlat, dlon = (max_lat - min_lat) * margin, (max_lon - min_lon) * margin
+        return (max(min_lat - dlat, -MAX_LAT), min(max_lat + dlat, MAX_LAT),
+                max(min_lon - dlon, -180.0), min(max_lon + dlon, 180.0))
+
+    def schedule_viewport_refresh(self, event=None):
+        if self._viewport_job is not None:
+            self.after_cancel(self._viewport_job)
+        self._viewport_job = self.after(VIEWPORT_DEBOUNCE_MS, self.on_viewport_changed)
+
+    def on_viewport_changed(self):
+        self._viewport_job = None
+        # Panning inside the already-loaded margin needs no new query
+        if self._loaded_bounds and self._loaded_zoom == round(self.map_widget.zoom):
+            lat0, lat1, lon0, lon1 = self.viewport_bounds()
+            l_lat0, l_lat1, l_lon0, l_lon1 = self._loaded_bounds
+            if l_lat0 <= lat0 and lat1 <= l_lat1 and l_lon0 <= lon0 and lon1 <= l_lon1:
+                return
+        self.refresh_hazards()
 
     def on_map_left_click(self, coords):
         lat, lon = coords
         # Create new hazard record
-        conn = self.db_connect()
-        c = conn.cursor()
         date_reported = datetime.now().isoformat()
-        c.execute("INSERT INTO Hazards (latitude,longitude,description,severity,status,date_reported) VALUES (?,?,?,?,?,?)",
-                  (lat, lon, "", "Low", "Logged", date_reported))
-        hazard_id = c.lastrowid
-        conn.commit()
-        conn.close()
-        # Add marker
-        marker = self.map_widget.set_marker(lat, lon, text=f"ID:{hazard_id}")
-        marker.data = hazard_id
-        # tkintermapview markers expose a `command` attribute that is executed on
-        # click. Use this instead of the nonexistent `set_text_marker_callback`.
-        marker.command = lambda m=marker: self.open_hazard_detail(m.data)
-        # Refresh list
+        future = execute("INSERT INTO Hazards (latitude,longitude,description,severity,status,date_reported) VALUES (?,?,?,?,?,?)",
+                         (lat, lon, "", "Low", "Logged", date_reported))
+
+        def created(hazard_id):
+            # Add marker and list row for just this hazard
+            self.refresh_hazard(hazard_id)
+            # Open detail form
+            self.open_hazard_detail(hazard_id)
+        when_done(self, future, created)
+
+    def apply_filters(self):
         self.refresh_hazards()
-        # Open detail form
-        self.open_hazard_detail(hazard_id)
 
     def refresh_hazards(self):
-        # Clear map markers and tree
-        self.map_widget.delete_all_marker()
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        # Query DB
-        conn = self.db_connect(); c = conn.cursor()
-        sql = "SELECT id,latitude,longitude,description,severity,status,date_reported FROM Hazards"
-        filters = []
-        if self.sev_var.get() != "All":
-            filters.append(f"severity = '{self.sev_var.get()}'")
-        if self.stat_var.get() != "All":
-            filters.append(f"status = '{self.stat_var.get()}'")
-        if filters:
-            sql += " WHERE " + " AND ".join(filters)
-        c.execute(sql)
-        for hid,lat,lon,desc,sev,stat,dt in c.fetchall():
-            # Add to tree
-            self.tree.insert('', 'end', values=(hid, desc[:20], sev, stat, dt.split('T')[0]))
-            # Add marker
-            m = self.map_widget.set_marker(lat, lon, text=f"ID:{hid}")
-            m.data = hid
-            # Configure the click callback using the marker's `command` attribute.
-            m.command = lambda m=m: self.open_hazard_detail(m.data)
-        conn.close()
+        # Query DB: only hazards inside the viewport (plus margin), driven by
+        # the R-tree, and their clusters at this zoom, grouped in SQL
+        bounds = self.viewport_bounds(VIEWPORT_MARGIN)
+        zoom = round(self.map_widget.zoom)
+        cells = cell_range(zoom, bounds) if zoom <= CLUSTER_MAX_ZOOM else None
+        if cells:
+            bounds = cell_bounds(zoom, *cells)  # whole cells, so every hazard of a drawn cluster is listed too
+        self._refresh_seq += 1
+        seq = self._refresh_seq
+
+        def loaded(result):
+            if seq != self._refresh_seq:
+                return  # a newer refresh is in flight
+            self._loaded_bounds, self._loaded_zoom = bounds, zoom
+            result, self.clusters = result
+            rows = {row[0]: row for row in result}
+            # Diff against what is already listed: only touch added/removed/changed hazards
+            for hid in [hid for hid in self._rows if hid not in rows]:
+                self._hide_row(hid)
+            for row in rows.values():
+                self._show_row(row)
+            self.redraw_markers()
+        when_done(self, db_read(load_viewport, zoom, bounds, cells, *self.filter_conditions()), loaded,
+                  name="hazards.refresh_hazards")
+
+    def refresh_hazard(self, hazard_id):
+        # Re-read a single hazard after an edit; O(1) widget work
+        when_done(self, query("SELECT id,latitude,longitude,description,severity,status,date_reported FROM Hazards WHERE id=?", (hazard_id,)),
+                  lambda rows: self._apply_hazard(hazard_id, rows[0] if rows else None))
+
+    def _apply_hazard(self, hazard_id, row):
+        # Same filters, so the loaded clusters are adjusted rather than reloaded:
+        # every hazard they count is listed in _rows with the values it was counted with
+        old = self._rows.get(hazard_id)
+        if self.clusters is not None:
+            if old is not None:
+                self.clusters.remove(hazard_id, old[1], old[2], old[4])
+            if row and self._in_view(row):
+                self.clusters.add(row[0], row[1], row[2], row[4])
+        if row and self._in_view(row):
+            self._show_row(row)
+        elif hazard_id in self._rows:
+            self._hide_row(hazard_id)
+        self.redraw_markers()
+
+    def _matches_filters(self, row):
+        sev, stat = row[4], row[5]
+        if self.sev_var.get() != "All" and sev != self.sev_var.get():
+            return False
+        return self.stat_var.get() == "All" or stat == self.stat_var.get()
+
+    def _in_view(self, row):
+        lat, lon = row[1], row[2]
+        if lat is None or lon is None or not self._loaded_bounds or not self._matches_filters(row):
+            return False
+        min_lat, max_lat, min_lon, max_lon = self._loaded_bounds
+        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+    def _show_row(self, row):
+        # Add or update the tree row (iid = hazard id) for one hazard
+        hid, lat, lon, desc, sev, stat, dt = row
+        old = self._rows.get(hid)
+        if old == row:
+            return
+        values = (hid, desc[:20], sev, stat, dt.split('T')[0])
+        if old is None:
+            self.tree.insert('', 'end', iid=str(hid), values=values)
+        else:
+            self.tree.item(str(hid), values=values)
+        self._rows[hid] = row
+
+    def _hide_row(self, hid):
+        self.tree.delete(str(hid))
+        del self._rows[hid]
+
+    def redraw_markers(self):
+        if self._loaded_bounds is None:
+            return  # first viewport query still running
+        # Decide which single-hazard and cluster markers belong on screen, then
+        # create/move/delete only the ones that differ from what is drawn.
+        zoom = self._loaded_zoom
+        singles, groups = {}, {}
+        if self.clusters is not None:
+            for key, cl in self.clusters.cells.items():
+                if cl.count == 1:
+                    if cl.rep is None:
+                        cl.rep = self._single_in_cell(key)
+                    row = self._rows.get(cl.rep)
+                    if row:
+                        singles[cl.rep] = (row[1], row[2])  # exact, unlike sums left by removes
+                else:
+                    groups[(zoom,) + key] = cl
+        else:
+            singles = {hid: (row[1], row[2]) for hid, row in self._rows.items()}
+
+        for hid in [hid for hid in self._markers if hid not in singles]:
+            self._markers.pop(hid).delete()
+        for hid, pos in singles.items():
+            m = self._markers.get(hid)
+            if m is None:
+                m = self.map_widget.set_marker(*pos, text=f"ID:{hid}")
+                m.data = hid
+                # Configure the click callback using the marker's `command` attribute.
+                m.command = lambda m=m: self.open_hazard_detail(m.data)
+                self._markers[hid] = m
+            elif tuple(m.position) != pos:
+                m.set_position(*pos)
+
+        for key in [key for key in self._cluster_markers if key not in groups]:
+            self._cluster_markers.pop(key)[0].delete()
+        for key, cl in groups.items():
+            summary = (cl.count, cl.worst_severity, cl.position)
+            drawn = self._cluster_markers.get(key)
+            if drawn and drawn[1] == summary:
+                m = drawn[0]
+            else:
+                if drawn:
+                    drawn[0].delete()
+                circle, outside = SEVERITY_COLORS.get(summary[1], SEVERITY_COLORS["Low"])
+                m = self.map_widget.set_marker(*cl.position, text=f"{cl.count} ({summary[1]})",
+                                               marker_color_circle=circle, marker_color_outside=outside)
+                self._cluster_markers[key] = (m, summary)
+            # Rebound every time: the index may have been reloaded since the marker was drawn
+            m.command = lambda m, key=key, cl=cl: self.expand_cluster(key, cl)
+
+    def _single_in_cell(self, key):
+        # The one listed hazard left in a cell after a remove
+        return next((hid for hid, row in self._rows.items() if self.clusters.key_of(row[1], row[2]) == key), None)
+
+    def expand_cluster(self, key, cluster):
+        # key: (zoom, cell x, cell y) as in _cluster_markers; zoom in until the
+        # cell's hazards split, judged from their extent
+        lat, lon = cluster.position
+
+        def zoom_to(rows):
+            extent = rows[0] if rows and rows[0][0] is not None else None
+            zoom = expansion_zoom(key[0], extent) if extent else key[0] + 1
+            self.map_widget.set_position(lat, lon, zoom=zoom)
+            self.refresh_hazards()
+        when_done(self, query(*extent_query(key[0], key[1:], *self.filter_conditions())), zoom_to,
+                  name="hazards.expand_cluster")
 
     def on_tree_select(self, event):
         sel = self.tree.selection()
         if not sel: return
         hid = self.tree.item(sel[0])['values'][0]
-        # Center map
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("SELECT latitude,longitude FROM Hazards WHERE id=?", (hid,))
-        row = c.fetchone(); conn.close()
+        # Center map; listed rows already carry their coordinates
+        row = self._rows.get(hid)
         if row:
-            self.map_widget.set_position(row[0], row[1], zoom=15)
+            self.map_widget.set_position(row[1], row[2], zoom=15)
+            self.schedule_viewport_refresh()
             self.open_hazard_detail(hid)
 
     def open_hazard_detail(self, hazard_id):
-        # Fetch hazard data
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("SELECT * FROM Hazards WHERE id=?", (hazard_id,))
-        data = c.fetchone(); conn.close()
-        if not data: return
+        # Fetch hazard data, then build the window
+        when_done(self, query("SELECT * FROM Hazards WHERE id=?", (hazard_id,)),
+                  lambda rows: rows and self._hazard_detail_window(hazard_id, rows[0]))
+
+    def _hazard_detail_window(self, hazard_id, data):
         # Detail window
         win = tk.Toplevel(self)
         win.title(f"Hazard {hazard_id} Details")
@@ -159,74 +398,70 @@ class HazardMapFrame(ttk.Frame):
         # Photo upload button
         photo_frame = ttk.Frame(win)
         photo_frame.grid(row=2, column=0, columnspan=4, pady=5)
-        photo_paths = []
+        def show_photo(key):
+            ttk.Label(photo_frame, text=key[:12]).pack(side='left', padx=2)
+        when_done(win, query("SELECT photo FROM HazardPhotos WHERE hazard_id=?", (hazard_id,)),
+                  lambda rows: [show_photo(r[0]) for r in rows])
         def add_photo():
             path = filedialog.askopenfilename(filetypes=[("Images","*.jpg *.png *.jpeg")])
             if path:
-                dest = os.path.join("images", f"hazard_{hazard_id}_{len(photo_paths)}" + os.path.splitext(path)[1])
-                os.makedirs(os.path.dirname(dest), exist_ok=True)
-                with open(path, 'rb') as fr, open(dest, 'wb') as fw:
-                    fw.write(fr.read())
-                photo_paths.append(dest)
-                ttk.Label(photo_frame, text=os.path.basename(dest)).pack(side='left', padx=2)
+                # Hashed and copied into the photo store off the Tk thread
+                def stored(key):
+                    when_done(self, execute("INSERT OR IGNORE INTO HazardPhotos(hazard_id, photo) VALUES (?,?)", (hazard_id, key)),
+                              lambda _: show_photo(key) if photo_frame.winfo_exists() else None)
+                when_done(self, store_photo_async(path), stored,
+                          lambda e: messagebox.showerror("Add Photo", f"Could not store photo: {e}"))
         ttk.Button(win, text="Add Photo", command=add_photo).grid(row=2, column=4)
         # TODO: Display mitigation notes (list) and allow adding notes
         # Save button
         def save():
-            conn = self.db_connect(); c = conn.cursor()
-            c.execute("UPDATE Hazards SET description=?,severity=?,status=? WHERE id=?",
-                      (desc_var.get(), sev_var.get(), stat_var.get(), hazard_id))
-            conn.commit(); conn.close()
-            win.destroy(); self.refresh_hazards()
+            future = execute("UPDATE Hazards SET description=?,severity=?,status=? WHERE id=?",
+                             (desc_var.get(), sev_var.get(), stat_var.get(), hazard_id))
+            win.destroy()
+            when_done(self, future, lambda _: self.refresh_hazard(hazard_id))
         ttk.Button(win, text="Save", command=save).grid(row=10, column=3, pady=10)
 
     def import_csv(self):
         path = filedialog.askopenfilename(filetypes=[("CSV","*.csv")])
         if not path: return
-        conn = self.db_connect(); c = conn.cursor()
-        with open(path) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                c.execute("INSERT INTO Hazards (latitude,longitude,description,severity,status,date_reported) VALUES (?,?,?,?,?,?)",
-                          (float(row['latitude']), float(row['longitude']), row.get('description',''),
-                           row.get('severity','Low'), row.get('status','Logged'), row.get('date_reported',datetime.now().isoformat())))
-        conn.commit(); conn.close(); self.refresh_hazards()
+        answer = messagebox.askyesnocancel(
+            "Import CSV",
+            "Update hazards that already exist (same location and report date)?\n\n"
+            "Yes = update them, No = skip those rows")
+        if answer is None: return
+        job = HazardCsvImport(path, mode="upsert" if answer else "skip")
+
+        def finished(msg):
+            self.refresh_hazards()
+            if msg[0] == "failed":
+                messagebox.showerror("Import CSV", f"Import stopped: {msg[1]}")
+                return
+            counts = msg[1]
+            summary = (f"{counts['inserted']} inserted, {counts['updated']} updated, "
+                       f"{counts['skipped']} duplicates skipped, {counts['errors']} rows rejected")
+            if job.cancelled.is_set():
+                summary = "Import cancelled.\n" + summary
+            if job.errors:
+                log_path = os.path.splitext(path)[0] + "_import_errors.csv"
+                job.write_error_log(log_path)
+                first = "\n".join(f"line {n}: {e}" for n, e in job.errors[:5])
+                summary += f"\n\n{first}\n\nFull error log: {log_path}"
+            messagebox.showinfo("Import CSV", summary)
+
+        # The import itself runs on a worker thread behind a progress window
+        watch_job(self, job, "Importing Hazards", finished)
 
     def export_csv(self):
         path = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[("CSV","*.csv")])
         if not path: return
         # get current filtered hazards
-        conn = self.db_connect(); c = conn.cursor()
-        sql = "SELECT * FROM Hazards"
-        filters = []
-        if self.sev_var.get() != "All": filters.append(f"severity = '{self.sev_var.get()}'")
-        if self.stat_var.get() != "All": filters.append(f"status = '{self.stat_var.get()}'")
-        if filters: sql += " WHERE " + " AND ".join(filters)
-        c.execute(sql)
-        rows = c.fetchall(); conn.close()
-        with open(path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([d[0] for d in c.description])
-            writer.writerows(rows)
-        messagebox.showinfo("Export CSV", f"Exported {len(rows)} hazards to {path}")
+        filters, params = self.filter_conditions()
+        when_done(self, db_read(write_csv, path, and_filters("SELECT * FROM Hazards WHERE 1", filters), params),
+                  lambda n: messagebox.showinfo("Export CSV", f"Exported {n} hazards to {path}"),
+                  name="hazards.export_csv")
 
     def export_pdf(self):
         path = filedialog.asksaveasfilename(defaultextension='.pdf', filetypes=[("PDF","*.pdf")])
         if not path: return
-        c = canvas.Canvas(path, pagesize=letter)
-        width, height = letter
-        c.setFont("Helvetica", 14)
-        c.drawString(40, height - 40, "Hazard Report")
-        y = height - 80
-        conn = self.db_connect(); cur = conn.cursor()
-        cur.execute("SELECT id,description,severity,status,date_reported FROM Hazards")
-        for hid,desc,sev,stat,dt in cur.fetchall():
-            text = f"ID:{hid} | {desc[:30]} | {sev} | {stat} | {dt.split('T')[0]}"
-            c.drawString(40, y, text)
-            y -= 20
-            if y < 40:
-                c.showPage()
-                y = height - 40
-        conn.close()
-        c.save()
-        messagebox.showinfo("Export PDF", f"PDF report saved to {path}")
+        # Same filters as the list, streamed and laid out on a worker thread
+        run_pdf_report(self, hazard_report(path, *self.filter_conditions()))
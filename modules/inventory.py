@@ -1,10 +1,161 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import sqlite3, os
+import os
 from datetime import datetime
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from database import DB_FILE
+from functools import lru_cache
+from database import db_read, db_write, execute, get_conn, query
+from modules.jobs import when_done
+from modules.photo_store import store_photo_async, with_photo_key
+from modules.reports import PdfReport, run_pdf_report, write_csv
+from modules.virtual_list import PagedTreeview, invalidate_counts
+
+# (heading, select expression, NULL-free sort expression)
+ITEM_COLUMNS = [
+    ("ID", "item_id", "item_id"),
+    ("Name", "name", "IFNULL(name,'')"),
+    ("Category", "category", "IFNULL(category,'')"),
+    ("Location", "location", "IFNULL(location,'')"),
+    ("Qty", "quantity", "IFNULL(quantity,'')"),
+    ("Unit", "unit", "IFNULL(unit,'')"),
+    ("Threshold", "threshold", "IFNULL(threshold,'')"),
+    ("Supplier", "supplier", "IFNULL(supplier,'')"),
+]
+HISTORY_COLUMNS = [
+    ("Trans ID", "transaction_id", "transaction_id"),
+    ("Item", "item_id", "item_id"),
+    ("Person", "person", "IFNULL(person,'')"),
+    # Always set on check-out; left bare so the history indexes serve the sort
+    ("Out Date", "out_date", "out_date"),
+    ("Return Date", "actual_return_date", "IFNULL(actual_return_date,'')"),
+    ("Status", "status", "IFNULL(status,'')"),
+]
+
+LOW_STOCK_FILTER = "item_id IN (SELECT item_id FROM LowStock)"
+REORDER_SQL = (
+    "SELECT l.supplier, i.item_id, i.name, i.supplier_sku, i.quantity, i.threshold, l.shortfall, "
+    "i.unit_cost, i.supplier_contact "
+    "FROM LowStock l CROSS JOIN Items i ON i.item_id = l.item_id ORDER BY l.supplier, l.item_id")
+
+SEARCH_DEBOUNCE_MS = 250
+SEARCH_LIMIT = 500
+SEARCH_CACHE_SIZE = 32
+
+
+def fts_query(term):
+    # "gas mon" -> '"gas"* "mon"*': every word must match, as a prefix
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in term.split())
+
+
+@lru_cache(maxsize=SEARCH_CACHE_SIZE)
+def search_items(term, low_only=False):
+    # Recent searches are memoised; cleared by InventoryFrame.items_changed().
+    # Called on a DB reader thread, so get_conn() is that thread's connection.
+    return get_conn().execute(
+        "SELECT i.item_id,i.name,i.category,i.location,i.quantity,i.unit,i.threshold,i.supplier "
+        "FROM ItemsFts CROSS JOIN Items i ON i.item_id = ItemsFts.rowid "
+        "WHERE ItemsFts MATCH ?" + (" AND i." + LOW_STOCK_FILTER if low_only else "") +
+        " ORDER BY ItemsFts.rank LIMIT ?",
+        (fts_query(term), SEARCH_LIMIT)).fetchall()
+
+
+def reorder_candidates(conn):
+    # [(supplier, [(item_id, name, sku, qty, threshold, shortfall, unit_cost, contact)])]
+    # straight from the trigger-maintained LowStock table, suppliers A-Z
+    groups = []
+    for supplier, *item in conn.execute(REORDER_SQL):
+        if not groups or groups[-1][0] != supplier:
+            groups.append((supplier, []))
+        groups[-1][1].append(tuple(item))
+    return groups
+
+
+class StockError(Exception):
+    # A batch that would overdraw stock or return more than is checked out;
+    # nothing from the batch is written
+    pass
+
+
+def _item_label(conn, item_id):
+    row = conn.execute("SELECT name FROM Items WHERE item_id=?", (item_id,)).fetchone()
+    return f"{row[0]} (#{item_id})" if row else f"Item #{item_id}"
+
+
+def check_out_batch(conn, lines, person, expected, notes, photo=None):
+    # lines: {item_id: count}. Runs under db_write; BEGIN IMMEDIATE takes the
+    # write lock before the first stock check, so every decrement and
+    # Transactions row commits together or not at all.
+    ts = datetime.now().isoformat()
+    conn.execute("BEGIN IMMEDIATE")
+    for item_id, count in lines.items():
+        # Guarded decrement: no row changes unless the stock covers the count
+        if conn.execute("UPDATE Items SET quantity = quantity - ? WHERE item_id=? "
+                        "AND typeof(quantity) IN ('integer','real') AND quantity >= ?",
+                        (count, item_id, count)).rowcount != 1:
+            raise StockError(f"Not enough stock of {_item_label(conn, item_id)} for {count}")
+    conn.executemany(
+        "INSERT INTO Transactions(item_id,person,out_date,expected_return_date,out_notes,out_photo,status) "
+        "VALUES(?,?,?,?,?,?,'out')",
+        [(item_id, person, ts, expected, notes, photo)
+         for item_id, count in lines.items() for _ in range(count)])
+
+
+def return_batch(conn, lines, person, notes, photo=None):
+    # lines: {item_id: count}; closes the oldest outstanding check-outs of each
+    # item (only that person's when given) in one BEGIN IMMEDIATE transaction
+    ts = datetime.now().isoformat()
+    conn.execute("BEGIN IMMEDIATE")
+    for item_id, count in lines.items():
+        outs = [t for (t,) in conn.execute(
+            "SELECT transaction_id FROM Transactions WHERE item_id=? AND status='out'" +
+            (" AND person=?" if person else "") + " ORDER BY out_date, transaction_id LIMIT ?",
+            (item_id, person, count) if person else (item_id, count))]
+        if len(outs) < count:
+            raise StockError(f"Only {len(outs)} of {_item_label(conn, item_id)} checked out"
+                             + (f" to {person}" if person else ""))
+        conn.executemany(
+            "UPDATE Transactions SET actual_return_date=?, return_notes=?, return_photo=?, status='returned' "
+            "WHERE transaction_id=?", [(ts, notes, photo, t) for t in outs])
+        conn.execute("UPDATE Items SET quantity = quantity + ? WHERE item_id=?", (count, item_id))
+
+
+def items_report(path, filters, params):
+    where = " WHERE " + " AND ".join(f"({f})" for f in filters) if filters else ""
+    return PdfReport(
+        path, "Inventory Report",
+        [("ID", 0.6), ("Name", 2.6), ("Qty", 0.7), ("Threshold", 0.9), ("Supplier", 2.2)],
+        "SELECT item_id,name,quantity,threshold,supplier FROM Items" + where + " ORDER BY item_id", params)
+
+
+def find_item(conn, code):
+    # Scanned or typed code -> (item_id, name): an item ID or a supplier SKU
+    code = code.strip()
+    row = None
+    if code.isdigit():
+        row = conn.execute("SELECT item_id, name FROM Items WHERE item_id=?", (int(code),)).fetchone()
+    return row or conn.execute("SELECT item_id, name FROM Items WHERE supplier_sku=?", (code,)).fetchone()
+
+
+def load_kit(conn, name):
+    return conn.execute(
+        "SELECT k.item_id, i.name, k.quantity FROM Kits CROSS JOIN KitItems k ON k.kit_id = Kits.kit_id "
+        "CROSS JOIN Items i ON i.item_id = k.item_id WHERE Kits.name=? ORDER BY k.item_id", (name,)).fetchall()
+
+
+def save_kit(conn, name, lines):
+    # Replaces any kit of the same name
+    conn.execute("INSERT OR IGNORE INTO Kits(name) VALUES(?)", (name,))
+    kit_id = conn.execute("SELECT kit_id FROM Kits WHERE name=?", (name,)).fetchone()[0]
+    conn.execute("DELETE FROM KitItems WHERE kit_id=?", (kit_id,))
+    conn.executemany("INSERT INTO KitItems(kit_id,item_id,quantity) VALUES(?,?,?)",
+                     [(kit_id, item_id, count) for item_id, count in lines.items()])
+
+
+def low_stock_tags(values):
+    # Same rule as the LowStock triggers: numeric quantity at or below a numeric threshold
+    qty, threshold = values[4], values[6]
+    if isinstance(qty, (int, float)) and isinstance(threshold, (int, float)) and qty <= threshold:
+        return ('low',)
+    return ()
 
 
 class InventoryFrame(ttk.Frame):
@@ -16,50 +167,81 @@ class InventoryFrame(ttk.Frame):
         ttk.Label(control_frame, text="Search:").pack(side='left')
         self.search_var = tk.StringVar()
         ttk.Entry(control_frame, textvariable=self.search_var, width=30).pack(side='left', padx=5)
+        self._search_job = None
+        self._search_seq = 0
+        self.search_var.trace_add('write', self.schedule_search)
         ttk.Button(control_frame, text="Go", command=self.load_items).pack(side='left')
+        self.low_only_var = tk.BooleanVar()
+        ttk.Checkbutton(control_frame, text="Low stock only", variable=self.low_only_var,
+                        command=self.load_items).pack(side='left', padx=5)
         ttk.Button(control_frame, text="Add Item", command=self.add_item).pack(side='left', padx=5)
         ttk.Button(control_frame, text="Edit Item", command=self.edit_item).pack(side='left', padx=5)
         ttk.Button(control_frame, text="Delete Item", command=self.delete_item).pack(side='left', padx=5)
         ttk.Button(control_frame, text="Check-Out", command=self.check_out_item).pack(side='left', padx=5)
         ttk.Button(control_frame, text="Return", command=self.return_item).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Batch...", command=self.batch_window).pack(side='left', padx=5)
         ttk.Button(control_frame, text="View History", command=self.view_history).pack(side='left', padx=5)
         ttk.Button(control_frame, text="Export CSV", command=self.export_items_csv).pack(side='left', padx=5)
         ttk.Button(control_frame, text="Export PDF", command=self.export_items_pdf).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Reorder List", command=self.show_reorder).pack(side='left', padx=5)
 
-        # Inventory treeview
-        cols = ("ID","Name","Category","Location","Qty","Unit","Threshold","Supplier")
-        self.tree = ttk.Treeview(self, columns=cols, show='headings', selectmode='browse')
-        for col in cols:
-            self.tree.heading(col, text=col)
+        # Inventory treeview, paged from SQL as the user scrolls
+        self.item_list = PagedTreeview(self, "Items", "item_id", ITEM_COLUMNS,
+                                       tags=low_stock_tags, selectmode='browse')
+        self.tree = self.item_list.tree
+        for col, _, _ in ITEM_COLUMNS:
             self.tree.column(col, width=100 if col=='Name' else 60)
-        self.tree.pack(fill='both', expand=True)
+        self.item_list.pack(fill='both', expand=True)
 
         # Style for low stock
         self.tree.tag_configure('low', background='#ffcccc')
 
         self.load_items()
 
-    def db_connect(self):
-        return sqlite3.connect(DB_FILE)
+    def search_conditions(self):
+        conditions, params = [], []
+        if self.low_only_var.get():
+            conditions.append(LOW_STOCK_FILTER)
+        term = self.search_var.get().strip()
+        if fts_query(term):
+            conditions.append("item_id IN (SELECT rowid FROM ItemsFts WHERE ItemsFts MATCH ?)")
+            params.append(fts_query(term))
+        return conditions, params
+
+    def schedule_search(self, *args):
+        # Search as you type, once typing pauses
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE_MS, self.load_items)
 
     def load_items(self):
-        # Clear existing
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        # Fetch from DB
-        conn = self.db_connect(); c = conn.cursor()
+        self._search_job = None
+        self._search_seq += 1
+        seq = self._search_seq
         term = self.search_var.get().strip()
-        if term:
-            c.execute("SELECT item_id,name,category,location,quantity,unit,threshold,supplier FROM Items WHERE name LIKE ? OR category LIKE ?",
-                      (f'%{term}%', f'%{term}%'))
-        else:
-            c.execute("SELECT item_id,name,category,location,quantity,unit,threshold,supplier FROM Items")
-        for item in c.fetchall():
-            tags = ()
-            if item[4] <= item[6]:  # quantity <= threshold
-                tags = ('low',)
-            self.tree.insert('', 'end', values=item, tags=tags)
-        conn.close()
+        conditions = self.search_conditions()
+        if not fts_query(term):
+            self.item_list.set_filter(*conditions)
+            return
+        low_only = self.low_only_var.get()
+
+        def loaded(rows):
+            if seq != self._search_seq:
+                return  # superseded by a newer search
+            # Ranked hits (best first); a heading click re-sorts them in SQL
+            status = f"{len(rows)} matches" if len(rows) < SEARCH_LIMIT else f"Top {SEARCH_LIMIT} matches"
+            self.item_list.show_rows(rows, *conditions, status)
+        when_done(self, db_read(lambda conn: search_items(term, low_only)), loaded, name="inventory.search")
+
+    def items_changed(self, *args):
+        # Write callback: drop cached searches/counts and show the new state
+        search_items.cache_clear()
+        invalidate_counts("Items")
+        self.load_items()
+
+    def transactions_changed(self, *args):
+        invalidate_counts("Transactions")
+        self.items_changed()
 
     def add_item(self):
         self._item_form()
@@ -75,10 +257,7 @@ class InventoryFrame(ttk.Frame):
         if not sel: return
         item_id = self.tree.item(sel[0])['values'][0]
         if not messagebox.askyesno("Confirm", "Delete selected item?"): return
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("DELETE FROM Items WHERE item_id=?", (item_id,))
-        conn.commit(); conn.close()
-        self.load_items()
+        when_done(self, execute("DELETE FROM Items WHERE item_id=?", (item_id,)), self.items_changed)
 
     def _item_form(self, item_id=None):
         is_edit = item_id is not None
@@ -92,26 +271,24 @@ class InventoryFrame(ttk.Frame):
             ttk.Entry(win, textvariable=var, width=30).grid(row=i, column=1)
             vars[f] = var
         if is_edit:
-            conn = self.db_connect(); c = conn.cursor()
-            c.execute("SELECT name,category,location,quantity,unit,threshold,supplier,supplier_contact,supplier_sku,unit_cost FROM Items WHERE item_id=?", (item_id,))
-            row = c.fetchone(); conn.close()
-            for f, val in zip(fields, row):
-                vars[f].set(val)
+            def loaded(rows):
+                for f, val in zip(fields, rows[0] if rows else ()):
+                    vars[f].set(val)
+            when_done(win, query("SELECT name,category,location,quantity,unit,threshold,supplier,supplier_contact,supplier_sku,unit_cost FROM Items WHERE item_id=?", (item_id,)), loaded)
         def save():
             data = [vars[f].get() for f in fields]
-            conn = self.db_connect(); c = conn.cursor()
             if is_edit:
-                c.execute(
+                future = execute(
                     "UPDATE Items SET name=?,category=?,location=?,quantity=?,unit=?,threshold=?,supplier=?,supplier_contact=?,supplier_sku=?,unit_cost=? WHERE item_id=?",
                     (*data, item_id)
                 )
             else:
-                c.execute(
+                future = execute(
                     "INSERT INTO Items(name,category,location,quantity,unit,threshold,supplier,supplier_contact,supplier_sku,unit_cost) VALUES(?,?,?,?,?,?,?,?,?,?)",
                     data
                 )
-            conn.commit(); conn.close()
-            win.destroy(); self.load_items()
+            win.destroy()
+            when_done(self, future, self.items_changed)
         ttk.Button(win, text="Save", command=save).grid(row=len(fields), column=1, pady=5)
 
     def check_out_item(self):
@@ -125,32 +302,32 @@ class InventoryFrame(ttk.Frame):
         ret_var = tk.StringVar(); ttk.Entry(win, textvariable=ret_var).grid(row=1, column=1)
         notes_txt = tk.Text(win, width=40, height=4); notes_txt.grid(row=2, column=1)
         ttk.Label(win, text="Notes:").grid(row=2, column=0)
-        photo_path = [None]
+        photo = [None]  # Future of the photo's store key
         def add_photo():
             p = filedialog.askopenfilename(filetypes=[("Images","*.jpg *.png")])
             if p:
-                dest = os.path.join("images", f"trans_out_{datetime.now().strftime('%Y%m%d%H%M%S')}{os.path.splitext(p)[1]}")
-                os.makedirs("images", exist_ok=True)
-                with open(p,'rb') as fr, open(dest,'wb') as fw: fw.write(fr.read())
-                photo_path[0] = dest
-                ttk.Label(win, text=os.path.basename(dest)).grid(row=3, column=1)
+                photo[0] = store_photo_async(p)
+                label = ttk.Label(win, text=f"Storing {os.path.basename(p)}...")
+                label.grid(row=3, column=1)
+                when_done(label, photo[0], lambda key: label.configure(text=os.path.basename(p)),
+                          lambda e: label.configure(text=f"Could not store photo: {e}"))
         ttk.Button(win, text="Add Photo", command=add_photo).grid(row=3, column=0)
         def save():
-            ts = datetime.now().isoformat()
-            conn = self.db_connect(); c = conn.cursor()
-            c.execute("INSERT INTO Transactions(item_id,person,out_date,expected_return_date,out_notes,out_photo,status) VALUES(?,?,?,?,?,?,?)",
-                      (item_id, person_var.get(), ts, ret_var.get(), notes_txt.get("1.0","end").strip(), photo_path[0], 'out'))
-            # decrement quantity
-            c.execute("UPDATE Items SET quantity = quantity - 1 WHERE item_id=?", (item_id,))
-            conn.commit(); conn.close()
-            win.destroy(); self.load_items()
+            values = (person_var.get(), ret_var.get(), notes_txt.get("1.0","end").strip())
+            pending = photo[0]
+            win.destroy()
+            # No check-out below zero stock (StockError), as in the batch window
+            with_photo_key(self, pending, lambda key: when_done(
+                self, db_write(check_out_batch, {item_id: 1}, *values, key), self.transactions_changed,
+                lambda e: messagebox.showerror("Check-Out", str(e))))
         ttk.Button(win, text="Save", command=save).grid(row=4, column=1, pady=5)
 
     def return_item(self):
         # select from outstanding transactions
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("SELECT transaction_id, item_id FROM Transactions WHERE status='out'")
-        outs = c.fetchall(); conn.close()
+        when_done(self, query("SELECT transaction_id, item_id FROM Transactions WHERE status='out'"),
+                  self._return_form)
+
+    def _return_form(self, outs):
         if not outs: return
         win = tk.Toplevel(self); win.title("Return Item")
         ttk.Label(win, text="Transaction:").grid(row=0, column=0)
@@ -159,31 +336,132 @@ class InventoryFrame(ttk.Frame):
         ttk.Combobox(win, textvariable=trans_var, values=vals, width=30).grid(row=0, column=1)
         notes_txt = tk.Text(win, width=40, height=4); notes_txt.grid(row=1, column=1)
         ttk.Label(win, text="Return Notes:").grid(row=1, column=0)
-        photo_path = [None]
+        photo = [None]  # Future of the photo's store key
         def add_photo():
             p = filedialog.askopenfilename(filetypes=[("Images","*.jpg *.png")])
             if p:
-                dest = os.path.join("images", f"trans_in_{datetime.now().strftime('%Y%m%d%H%M%S')}{os.path.splitext(p)[1]}")
-                os.makedirs("images", exist_ok=True)
-                with open(p,'rb') as fr, open(dest,'wb') as fw: fw.write(fr.read())
-                photo_path[0] = dest
-                ttk.Label(win, text=os.path.basename(dest)).grid(row=2, column=1)
+                photo[0] = store_photo_async(p)
+                label = ttk.Label(win, text=f"Storing {os.path.basename(p)}...")
+                label.grid(row=2, column=1)
+                when_done(label, photo[0], lambda key: label.configure(text=os.path.basename(p)),
+                          lambda e: label.configure(text=f"Could not store photo: {e}"))
         ttk.Button(win, text="Add Photo", command=add_photo).grid(row=2, column=0)
         def save():
-            sel = trans_var.get().split()[0]
+            if trans_var.get() not in vals: return
+            sel, iid = outs[vals.index(trans_var.get())]
             ts = datetime.now().isoformat()
-            conn = self.db_connect(); c = conn.cursor()
-            c.execute("UPDATE Transactions SET actual_return_date=?, return_notes=?, return_photo=?, status='returned' WHERE transaction_id=?",
-                      (ts, notes_txt.get("1.0","end").strip(), photo_path[0], sel))
-            # increment quantity
-            # get item_id
-            c.execute("SELECT item_id FROM Transactions WHERE transaction_id=?", (sel,))
-            iid = c.fetchone()[0]
-            c.execute("UPDATE Items SET quantity = quantity + 1 WHERE item_id=?", (iid,))
-            conn.commit(); conn.close()
-            win.destroy(); self.load_items()
+            notes = notes_txt.get("1.0","end").strip()
+            pending = photo[0]
+            def write(conn, key):
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("UPDATE Transactions SET actual_return_date=?, return_notes=?, return_photo=?, status='returned' "
+                                "WHERE transaction_id=? AND status='out'", (ts, notes, key, sel)).rowcount != 1:
+                    raise StockError(f"Transaction {sel} is already returned")
+                conn.execute("UPDATE Items SET quantity = quantity + 1 WHERE item_id=?", (iid,))
+            win.destroy()
+            with_photo_key(self, pending, lambda key: when_done(self, db_write(write, key), self.transactions_changed))
         ttk.Button(win, text="Save", command=save).grid(row=3, column=1, pady=5)
 
+    def batch_window(self):
+        # Scan items (ID or SKU) or load a kit, then check them all out or
+        # return them in one transaction
+        win = tk.Toplevel(self); win.title("Batch Check-Out / Return")
+        lines = {}  # item_id -> [name, count]
+        mode_var = tk.StringVar(value="out")
+        top = ttk.Frame(win); top.pack(fill='x', padx=5, pady=5)
+        ttk.Radiobutton(top, text="Check-Out", variable=mode_var, value="out").pack(side='left')
+        ttk.Radiobutton(top, text="Return", variable=mode_var, value="return").pack(side='left', padx=5)
+        ttk.Label(top, text="Scan ID/SKU:").pack(side='left', padx=5)
+        scan_var = tk.StringVar()
+        scan_entry = ttk.Entry(top, textvariable=scan_var, width=20); scan_entry.pack(side='left')
+        scan_entry.focus_set()
+        status_var = tk.StringVar()
+
+        tree = ttk.Treeview(win, columns=("ID", "Name", "Count"), show='headings', height=12)
+        for col, width in (("ID", 60), ("Name", 220), ("Count", 60)):
+            tree.heading(col, text=col); tree.column(col, width=width)
+        tree.pack(fill='both', expand=True, padx=5)
+
+        def redraw():
+            tree.delete(*tree.get_children())
+            for item_id, (name, count) in lines.items():
+                tree.insert('', 'end', iid=item_id, values=(item_id, name, count))
+            status_var.set(f"{len(lines)} items, {sum(c for _, c in lines.values())} units")
+
+        def add(item_id, name, count=1):
+            line = lines.setdefault(item_id, [name, 0])
+            line[1] += count
+            redraw()
+
+        def scan(event=None):
+            code = scan_var.get().strip()
+            if not code: return
+            scan_var.set("")
+            def found(row):
+                if row:
+                    add(*row)
+                else:
+                    status_var.set(f"No item matches {code!r}")
+            when_done(win, db_read(find_item, code), found)
+        scan_entry.bind('<Return>', scan)
+
+        def remove():
+            for iid in tree.selection():
+                item_id = int(iid)
+                lines[item_id][1] -= 1
+                if lines[item_id][1] <= 0:
+                    del lines[item_id]
+            redraw()
+
+        kit_row = ttk.Frame(win); kit_row.pack(fill='x', padx=5, pady=5)
+        ttk.Button(kit_row, text="Remove One", command=remove).pack(side='left')
+        ttk.Button(kit_row, text="Clear", command=lambda: (lines.clear(), redraw())).pack(side='left', padx=5)
+        ttk.Label(kit_row, text="Kit:").pack(side='left', padx=5)
+        kit_var = tk.StringVar()
+        kit_box = ttk.Combobox(kit_row, textvariable=kit_var, width=20); kit_box.pack(side='left')
+        def refresh_kits():
+            when_done(kit_box, query("SELECT name FROM Kits ORDER BY name"),
+                      lambda rows: kit_box.configure(values=[r[0] for r in rows]))
+        def load():
+            def loaded(rows):
+                for item_id, name, count in rows:
+                    add(item_id, name, count)
+                if not rows:
+                    status_var.set(f"No kit named {kit_var.get()!r}")
+            when_done(win, db_read(load_kit, kit_var.get().strip()), loaded)
+        def save_as_kit():
+            name = kit_var.get().strip()
+            if not name or not lines: return
+            counts = {item_id: count for item_id, (_, count) in lines.items()}
+            when_done(win, db_write(save_kit, name, counts),
+                      lambda _: (status_var.set(f"Saved kit {name!r}"), refresh_kits()))
+        ttk.Button(kit_row, text="Load Kit", command=load).pack(side='left', padx=5)
+        ttk.Button(kit_row, text="Save as Kit", command=save_as_kit).pack(side='left')
+        refresh_kits()
+
+        form = ttk.Frame(win); form.pack(fill='x', padx=5)
+        ttk.Label(form, text="Person:").grid(row=0, column=0, sticky='w')
+        person_var = tk.StringVar(); ttk.Entry(form, textvariable=person_var).grid(row=0, column=1, sticky='w')
+        ttk.Label(form, text="Expected Return (YYYY-MM-DD):").grid(row=1, column=0, sticky='w')
+        ret_var = tk.StringVar(); ttk.Entry(form, textvariable=ret_var).grid(row=1, column=1, sticky='w')
+        ttk.Label(form, text="Notes:").grid(row=2, column=0, sticky='w')
+        notes_var = tk.StringVar(); ttk.Entry(form, textvariable=notes_var, width=40).grid(row=2, column=1, sticky='w')
+        ttk.Label(win, textvariable=status_var).pack(fill='x', padx=5)
+
+        def apply():
+            if not lines: return
+            counts = {item_id: count for item_id, (_, count) in lines.items()}
+            if mode_var.get() == "out":
+                future = db_write(check_out_batch, counts, person_var.get(), ret_var.get(), notes_var.get())
+            else:
+                future = db_write(return_batch, counts, person_var.get().strip(), notes_var.get())
+            def done(_):
+                win.destroy()
+                self.transactions_changed()
+            # A StockError rolls the whole batch back; keep the list so it can be fixed
+            when_done(win, future, done, lambda e: messagebox.showerror("Batch Rejected", str(e), parent=win))
+        ttk.Button(win, text="Apply Batch", command=apply).pack(pady=5)
+
     def view_history(self):
         sel = self.tree.selection()
         # if item selected, filter history for that item; else show all
@@ -191,47 +469,48 @@ class InventoryFrame(ttk.Frame):
         if sel:
             item_filter = self.tree.item(sel[0])['values'][0]
         win = tk.Toplevel(self); win.title("Transaction History")
-        cols = ("Trans ID","Item","Person","Out Date","Return Date","Status")
-        tree = ttk.Treeview(win, columns=cols, show='headings')
+        history = PagedTreeview(win, "Transactions", "transaction_id", HISTORY_COLUMNS,
+                                sort="Out Date", descending=True)
+        for col, _, _ in HISTORY_COLUMNS:
+            history.tree.column(col, width=100)
+        history.pack(fill='both', expand=True)
+        if item_filter:
+            history.set_filter(["item_id = ?"], [item_filter])
+        else:
+            history.reload()
+
+    def show_reorder(self):
+        # Low-stock items grouped under their supplier
+        win = tk.Toplevel(self); win.title("Reorder Candidates")
+        cols = ("SKU", "Qty", "Threshold", "Shortfall", "Est. Cost", "Contact")
+        tree = ttk.Treeview(win, columns=cols, height=20)
+        tree.heading('#0', text="Supplier / Item")
+        tree.column('#0', width=220)
         for col in cols:
             tree.heading(col, text=col)
-            tree.column(col, width=100)
+            tree.column(col, width=90)
         tree.pack(fill='both', expand=True)
-        conn = self.db_connect(); c = conn.cursor()
-        if item_filter:
-            c.execute("SELECT transaction_id,item_id,person,out_date,actual_return_date,status FROM Transactions WHERE item_id=? ORDER BY out_date DESC", (item_filter,))
-        else:
-            c.execute("SELECT transaction_id,item_id,person,out_date,actual_return_date,status FROM Transactions ORDER BY out_date DESC")
-        for row in c.fetchall():
-            tree.insert('', 'end', values=row)
-        conn.close()
+
+        def loaded(groups):
+            for supplier, items in groups:
+                node = tree.insert('', 'end', text=f"{supplier or '(no supplier)'} ({len(items)})", open=True)
+                for item_id, name, sku, qty, threshold, shortfall, cost, contact in items:
+                    est = f"{shortfall * cost:.2f}" if isinstance(cost, (int, float)) else ""
+                    tree.insert(node, 'end', text=f"{item_id} {name or ''}",
+                                values=(sku or '', qty, threshold, shortfall, est, contact or ''))
+            if not groups:
+                tree.insert('', 'end', text="Nothing is below its threshold.")
+        when_done(win, db_read(reorder_candidates), loaded, name="inventory.reorder_candidates")
 
     def export_items_csv(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")])
         if not path: return
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("SELECT * FROM Items")
-        rows = c.fetchall()
-        with open(path, 'w', newline='') as f:
-            import csv; w = csv.writer(f)
-            w.writerow([col[0] for col in c.description])
-            w.writerows(rows)
-        conn.close(); messagebox.showinfo("Export CSV", f"Exported {len(rows)} items to {path}")
+        when_done(self, db_read(write_csv, path, "SELECT * FROM Items", ()),
+                  lambda n: messagebox.showinfo("Export CSV", f"Exported {n} items to {path}"),
+                  name="inventory.export_csv")
 
     def export_items_pdf(self):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF","*.pdf")])
         if not path: return
-        c = canvas.Canvas(path, pagesize=letter)
-        width, height = letter
-        c.setFont("Helvetica", 14)
-        c.drawString(40, height - 40, "Inventory Report")
-        y = height - 80
-        conn = self.db_connect(); cur = conn.cursor()
-        cur.execute("SELECT item_id,name,quantity,threshold,supplier FROM Items")
-        for iid,name,qty,thr,sup in cur.fetchall():
-            text = f"ID:{iid} | {name} | Qty:{qty} | Thr:{thr} | Sup:{sup}"
-            c.drawString(40, y, text)
-            y -= 20
-            if y < 40:
-                c.showPage(); y = height - 40
-        conn.close(); c.save(); messagebox.showinfo("Export PDF", f"PDF saved to {path}")
+        # Honour the current search, like the list does
+        run_pdf_report(self, items_report(path, *self.search_conditions()))
@@ -0,0 +1,65 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from modules.metrics import Timer
+
+POLL_MS = 100
+RESULT_POLL_MS = 15
+
+
+def when_done(widget, future, callback, errback=None, name=None):
+    # Deliver a database Future's result to callback on the Tk thread.
+    # Tk is not thread-safe, so poll with after() rather than calling back
+    # from the worker. A name records the wall time until the result is
+    # shown in the "ui" latency histogram (modules/metrics.py).
+    timer = Timer("ui", name) if name else None
+
+    def poll():
+        if not widget.winfo_exists():
+            return  # window closed while the query ran
+        if not future.done():
+            widget.after(RESULT_POLL_MS, poll)
+            return
+        exc = future.exception()
+        if exc is None:
+            callback(future.result())
+            if timer:
+                timer.stop()
+        elif errback is not None:
+            errback(exc)
+        else:
+            messagebox.showerror("Database Error", str(exc))
+    poll()
+
+
+def watch_job(parent, job, title, on_finish):
+    # Runs a background job (a thread exposing `messages` and `cancelled`) behind
+    # a progress window. The job posts ("progress", fraction, text) while it
+    # works and one final message, which is passed to on_finish(msg).
+    win = tk.Toplevel(parent); win.title(title)
+    status_var = tk.StringVar(value="Starting...")
+    ttk.Label(win, textvariable=status_var, width=50).pack(padx=10, pady=5)
+    bar = ttk.Progressbar(win, length=300, maximum=1.0)
+    bar.pack(padx=10, pady=5)
+    ttk.Button(win, text="Cancel", command=job.cancelled.set).pack(pady=5)
+    timer = Timer("ui", title)
+    win.protocol("WM_DELETE_WINDOW", job.cancelled.set)
+
+    def poll():
+        finished = None
+        while not job.messages.empty():
+            msg = job.messages.get()
+            if msg[0] == "progress":
+                bar['value'] = msg[1]
+                status_var.set(msg[2])
+            else:
+                finished = msg
+        if finished is None:
+            parent.after(POLL_MS, poll)
+            return
+        win.destroy()
+        timer.stop(f"{title}: {finished[0]}")
+        on_finish(finished)
+
+    job.start()
+    parent.after(POLL_MS, poll)
+    return win
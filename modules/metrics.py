@@ -0,0 +1,101 @@
+import re, threading, time
+from datetime import datetime
+from functools import lru_cache
+
+# In-process latency histograms, keyed by (kind, name): kind "sql" is a
+# statement fingerprint, "ui" a frame load/export from request to callback.
+# Anything slower than its threshold is also appended to the slow-query log.
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SLOW_MS = {"sql": 200, "ui": 1000}
+SLOW_LOG_FILE = "slow_queries.log"
+MAX_LOGGED_SQL = 2000
+SUMMARY_ROWS = 25
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_histograms = {}
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.count, self.total_ms, self.max_ms = 0, 0.0, 0.0
+
+    def observe(self, ms):
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile
+        seen, target = 0, self.count * p / 100
+        for bound, n in zip(BUCKETS_MS + (self.max_ms,), self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    # Literal values -> ?, IN lists -> (?...), whitespace collapsed, so statements
+    # built with inline values group with their parameterised runs
+    sql = _NUMBER.sub("?", _STRING.sub("?", sql))
+    return _SPACE.sub(" ", _LIST.sub("(?...)", sql)).strip()
+
+
+def observe(kind, name, ms, detail=None):
+    with _lock:
+        hist = _histograms.get((kind, name))
+        if hist is None:
+            hist = _histograms[(kind, name)] = Histogram()
+        hist.observe(ms)
+        if ms >= SLOW_MS[kind]:
+            _log(f"{datetime.now().isoformat(timespec='milliseconds')} {ms:9.1f} ms {kind:<3} "
+                 f"[{threading.current_thread().name}] {(detail or name)[:MAX_LOGGED_SQL]}\n")
+
+
+def _log(text):
+    try:
+        with open(SLOW_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(text)
+    except OSError:
+        pass  # instrumentation must never break the app
+
+
+class Timer:
+    # ms since construction; for timing work that finishes in a callback
+    def __init__(self, kind, name):
+        self.kind, self.name = kind, name
+        self.started = time.perf_counter()
+
+    def stop(self, detail=None):
+        observe(self.kind, self.name, (time.perf_counter() - self.started) * 1000, detail)
+
+
+def snapshot():
+    with _lock:
+        return {key: (h.count, h.total_ms, h.percentile(50), h.percentile(95), h.max_ms)
+                for key, h in _histograms.items()}
+
+
+def write_summary():
+    # Appended to the slow-query log at shutdown: the most expensive entries by total time
+    rows = sorted(snapshot().items(), key=lambda kv: kv[1][1], reverse=True)[:SUMMARY_ROWS]
+    if not rows:
+        return
+    lines = [f"--- session summary {datetime.now().isoformat(timespec='seconds')} "
+             f"(count, total ms, ~p50, ~p95, max ms) ---\n"]
+    for (kind, name), (count, total, p50, p95, peak) in rows:
+        lines.append(f"{count:8d} {total:10.1f} {p50:8.1f} {p95:8.1f} {peak:8.1f}  {kind:<3} {name[:200]}\n")
+    _log("".join(lines))
@@ -1,11 +1,77 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkcalendar import Calendar
-import sqlite3, os
-from datetime import datetime
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from database import DB_FILE
+import os
+from datetime import date, datetime, timedelta
+from database import db_read, db_write, execute, query
+from modules.jobs import when_done
+from modules.photo_store import store_photo_async, with_photo_key
+from modules.reports import PdfReport, run_pdf_report, write_csv
+
+# Per-day shift/incident counts for a whole month in one round trip
+MONTH_COUNTS_SQL = (
+    "SELECT 'shift', date, COUNT(*) FROM Shifts WHERE date >= ? AND date < ? GROUP BY date "
+    "UNION ALL "
+    "SELECT 'incident', incident_date, COUNT(*) FROM Incidents "
+    "WHERE incident_date >= ? AND incident_date < ? GROUP BY incident_date")
+SHIFTS_SQL = "SELECT shift_id, date, time_slot, crew FROM Shifts WHERE date=? ORDER BY time_slot"
+INCIDENT_COLUMNS = "incident_id,shift_id,category,description,photo_path,latitude,longitude,timestamp"
+EXPORT_SCOPES = ("All", "Selected day", "Visible month")
+
+# {(year, month): {'YYYY-MM-DD': [shifts, incidents]}}; writes call month_changed()
+_month_cache = {}
+
+
+def month_key(day):
+    # 'YYYY-MM-DD...' -> (year, month), or None for anything unparseable
+    try:
+        return int(day[:4]), int(day[5:7])
+    except (TypeError, ValueError):
+        return None
+
+
+def add_months(key, n):
+    year, month = divmod(key[0] * 12 + key[1] - 1 + n, 12)
+    return year, month + 1
+
+
+def month_bounds(key):
+    nxt = add_months(key, 1)
+    return f"{key[0]:04d}-{key[1]:02d}-01", f"{nxt[0]:04d}-{nxt[1]:02d}-01"
+
+
+def next_day(day):
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def incident_query(columns, start=None, end=None):
+    # Incidents with start <= incident_date < end ('YYYY-MM-DD'; None = open
+    # ended), oldest first. Served by idx_incidents_date.
+    conds, params = [], []
+    if start:
+        conds.append("incident_date >= ?"); params.append(start)
+    if end:
+        conds.append("incident_date < ?"); params.append(end)
+    sql = f"SELECT {columns} FROM Incidents"
+    if conds:
+        sql += " WHERE " + " AND ".join(conds)
+    return sql + " ORDER BY incident_date, timestamp", params
+
+
+def incident_report(path, start=None, end=None):
+    return PdfReport(
+        path, "Incident Report",
+        [("ID", 0.6), ("Shift", 0.6), ("Category", 1.2), ("Description", 3.6), ("Date", 1)],
+        *incident_query("incident_id,shift_id,category,description,timestamp", start, end),
+        format_row=lambda r: (r[0], r[1], r[2], (r[3] or '')[:70], (r[4] or '').split('T')[0]))
+
+
+def count_month(conn, key):
+    start, end = month_bounds(key)
+    days = {}
+    for kind, day, n in conn.execute(MONTH_COUNTS_SQL, (start, end, start, end)):
+        days.setdefault(day, [0, 0])[kind == 'incident'] = n
+    return days
 
 
 class PatrolFrame(ttk.Frame):
@@ -17,9 +83,14 @@ class PatrolFrame(ttk.Frame):
 
         # Calendar view frame
         cal_frame = ttk.Frame(self.paned, width=300)
-        self.calendar = Calendar(cal_frame, selectmode='day')
+        # ISO dates so shifts/incidents compare and range-scan as plain strings
+        self.calendar = Calendar(cal_frame, selectmode='day', date_pattern='yyyy-mm-dd')
         self.calendar.pack(fill='both', expand=True)
         self.calendar.bind("<<CalendarSelected>>", self.on_date_selected)
+        self.calendar.bind("<<CalendarMonthChanged>>", self.load_month_events)
+        self.calendar.tag_config('shift', background='#90caf9', foreground='black')
+        self.calendar.tag_config('incident', background='#ef9a9a', foreground='black')
+        self._month_events = {}  # (year, month) -> calevent ids drawn for it
         self.paned.add(cal_frame)
 
         # Right frame as Notebook for roster and incidents
@@ -58,7 +129,50 @@ class PatrolFrame(ttk.Frame):
         ttk.Button(btn_inc, text="Delete Incident", command=self.delete_incident).pack(side='left', padx=2)
         ttk.Button(btn_inc, text="Export CSV", command=self.export_inc_csv).pack(side='left', padx=2)
         ttk.Button(btn_inc, text="Export PDF", command=self.export_inc_pdf).pack(side='left', padx=2)
+        self.export_scope_var = tk.StringVar(value=EXPORT_SCOPES[0])
+        ttk.Combobox(btn_inc, textvariable=self.export_scope_var, values=EXPORT_SCOPES,
+                     state='readonly', width=14).pack(side='left', padx=2)
         self.load_incidents()
+        self.load_month_events()
+
+    def load_month_events(self, event=None):
+        # Mark days in the visible month, then prefetch its neighbours so
+        # paging the calendar back/forward is instant
+        month, year = self.calendar.get_displayed_month()
+        for n in (0, -1, 1):
+            self._load_month(add_months((year, month), n))
+
+    def _load_month(self, key):
+        if key in _month_cache:
+            if key not in self._month_events:
+                self._draw_month(key, _month_cache[key])
+            return
+
+        def loaded(days):
+            _month_cache[key] = days
+            self._draw_month(key, days)
+        when_done(self, db_read(count_month, key), loaded, name="patrol.month_counts")
+
+    def _draw_month(self, key, days):
+        for ev in self._month_events.pop(key, []):
+            self.calendar.calevent_remove(ev)
+        ids = []
+        for day, (shifts, incidents) in days.items():
+            try:
+                when = date.fromisoformat(day)
+            except ValueError:
+                continue  # hand-typed shift date
+            text = f"{shifts} shift(s), {incidents} incident(s)"
+            ids.append(self.calendar.calevent_create(when, text, 'incident' if incidents else 'shift'))
+        self._month_events[key] = ids
+
+    def month_changed(self, day):
+        # After a write: drop the cached counts for day's month and redraw it
+        key = month_key(day)
+        if key is None:
+            return
+        _month_cache.pop(key, None)
+        self._load_month(key)
 
     def on_date_selected(self, event):
         # Called when a date is selected in the calendar.
@@ -67,19 +181,17 @@ class PatrolFrame(ttk.Frame):
         self.load_shifts()
         self.load_incidents()
 
-    def db_connect(self):
-        return sqlite3.connect(DB_FILE)
-
     def load_shifts(self):
-        for r in self.roster_tree.get_children():
-            self.roster_tree.delete(r)
-        conn = self.db_connect(); c = conn.cursor()
         selected_date = self.calendar.get_date()
+
+        def loaded(rows):
+            if selected_date != self.calendar.get_date():
+                return  # user has moved on to another day
+            self.roster_tree.delete(*self.roster_tree.get_children())
+            for row in rows:
+                self.roster_tree.insert('', 'end', values=row)
         # Load only shifts matching selected date
-        c.execute("SELECT shift_id, date, time_slot, crew FROM Shifts WHERE date=? ORDER BY time_slot", (selected_date,))
-        for row in c.fetchall():
-            self.roster_tree.insert('', 'end', values=row)
-        conn.close()
+        when_done(self, query(SHIFTS_SQL, (selected_date,)), loaded, name="patrol.load_shifts")
 
     def add_shift(self):
         win = tk.Toplevel(self)
@@ -95,57 +207,65 @@ class PatrolFrame(ttk.Frame):
         ttk.Entry(win, textvariable=crew_var).grid(row=2, column=1)
 
         def save():
-            conn = self.db_connect(); c = conn.cursor()
-            c.execute("INSERT INTO Shifts(date,time_slot,crew) VALUES(?,?,?)",
-                      (date_var.get(), time_var.get(), crew_var.get()))
-            conn.commit(); conn.close()
-            win.destroy(); self.load_shifts()
+            day = date_var.get().strip()
+            try:
+                datetime.strptime(day, "%Y-%m-%d")  # stored ISO, like the calendar's dates
+            except ValueError:
+                messagebox.showerror("Add Shift", "Enter the date as YYYY-MM-DD.", parent=win)
+                return
+            future = execute("INSERT INTO Shifts(date,time_slot,crew) VALUES(?,?,?)",
+                             (day, time_var.get(), crew_var.get()))
+            win.destroy()
+            when_done(self, future, lambda _: (self.load_shifts(), self.month_changed(day)))
 
         ttk.Button(win, text="Save", command=save).grid(row=3, column=1, pady=5)
 
     def delete_shift(self):
         sel = self.roster_tree.selection()
         if not sel: return
-        sid = self.roster_tree.item(sel[0])['values'][0]
+        sid, day = self.roster_tree.item(sel[0])['values'][:2]
         if not messagebox.askyesno("Confirm", "Delete selected shift?" ): return
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("DELETE FROM Shifts WHERE shift_id=?", (sid,))
-        conn.commit(); conn.close()
-        self.load_shifts(); self.load_incidents()
+        when_done(self, execute("DELETE FROM Shifts WHERE shift_id=?", (sid,)),
+                  lambda _: (self.load_shifts(), self.load_incidents(), self.month_changed(day)))
 
     def load_incidents(self):
-        for r in self.inc_tree.get_children():
-            self.inc_tree.delete(r)
-        conn = self.db_connect(); c = conn.cursor()
         selected_date = self.calendar.get_date()
+
+        def loaded(rows):
+            if selected_date != self.calendar.get_date():
+                return  # user has moved on to another day
+            self.inc_tree.delete(*self.inc_tree.get_children())
+            for iid, sid, cat, desc, ts in rows:
+                self.inc_tree.insert('', 'end', values=(iid, sid, cat, desc[:20], ts.split('T')[0]))
         # Load incidents for selected date
-        c.execute("SELECT incident_id, shift_id, category, description, timestamp FROM Incidents WHERE DATE(timestamp)=? ORDER BY timestamp", (selected_date,))
-        for iid, sid, cat, desc, ts in c.fetchall():
-            self.inc_tree.insert('', 'end', values=(iid, sid, cat, desc[:20], ts.split('T')[0]))
-        conn.close()
+        when_done(self, query(*incident_query("incident_id, shift_id, category, description, timestamp",
+                                              selected_date, next_day(selected_date))), loaded,
+                  name="patrol.load_incidents")
 
     def log_incident(self):
         win = tk.Toplevel(self)
         win.title("Log Incident")
         ttk.Label(win, text="Shift ID:").grid(row=0, column=0)
         sid_var = tk.StringVar()
-        shifts = [str(r[0]) for r in self.db_connect().cursor().execute("SELECT shift_id FROM Shifts").fetchall()]
-        ttk.Combobox(win, textvariable=sid_var, values=shifts).grid(row=0, column=1)
+        cmb_shift = ttk.Combobox(win, textvariable=sid_var)
+        cmb_shift.grid(row=0, column=1)
+        when_done(cmb_shift, query("SELECT shift_id FROM Shifts"),
+                  lambda rows: cmb_shift.configure(values=[str(r[0]) for r in rows]))
         ttk.Label(win, text="Category:").grid(row=1, column=0)
         cat_var = tk.StringVar()
         ttk.Combobox(win, textvariable=cat_var, values=["Trespasser","Fence Damage","Other"]).grid(row=1, column=1)
         ttk.Label(win, text="Description:").grid(row=2, column=0)
         desc_txt = tk.Text(win, width=40, height=4); desc_txt.grid(row=2, column=1)
 
-        photo_path = [None]
+        photo = [None]  # Future of the photo's store key
         def add_photo():
             p = filedialog.askopenfilename(filetypes=[("Images","*.jpg *.png")])
             if p:
-                dest = os.path.join("images", f"incident_{datetime.now().strftime('%Y%m%d%H%M%S')}{os.path.splitext(p)[1]}")
-                os.makedirs("images", exist_ok=True)
-                with open(p, 'rb') as fr, open(dest, 'wb') as fw: fw.write(fr.read())
-                photo_path[0] = dest
-                ttk.Label(win, text=os.path.basename(dest)).grid(row=3, column=1)
+                photo[0] = store_photo_async(p)
+                label = ttk.Label(win, text=f"Storing {os.path.basename(p)}...")
+                label.grid(row=3, column=1)
+                when_done(label, photo[0], lambda key: label.configure(text=os.path.basename(p)),
+                          lambda e: label.configure(text=f"Could not store photo: {e}"))
         ttk.Button(win, text="Add Photo", command=add_photo).grid(row=3, column=0)
 
         ttk.Label(win, text="Latitude:").grid(row=4, column=0)
@@ -155,52 +275,45 @@ class PatrolFrame(ttk.Frame):
 
         def save():
             ts = datetime.now().isoformat()
-            conn = self.db_connect(); c = conn.cursor()
-            c.execute("INSERT INTO Incidents(shift_id,category,description,photo_path,latitude,longitude,timestamp) VALUES(?,?,?,?,?,?,?)",
-                      (sid_var.get(), cat_var.get(), desc_txt.get("1.0","end").strip(), photo_path[0], lat_var.get() or None, lon_var.get() or None, ts))
-            conn.commit(); conn.close()
-            win.destroy(); self.load_incidents()
+            values = (sid_var.get(), cat_var.get(), desc_txt.get("1.0","end").strip())
+            coords = (lat_var.get() or None, lon_var.get() or None, ts)
+            pending = photo[0]
+            def write(conn, key):
+                conn.execute("INSERT INTO Incidents(shift_id,category,description,photo_path,latitude,longitude,timestamp) VALUES(?,?,?,?,?,?,?)",
+                             values + (key,) + coords)
+            win.destroy()
+            with_photo_key(self, pending, lambda key: when_done(
+                self, db_write(write, key), lambda _: (self.load_incidents(), self.month_changed(ts))))
         ttk.Button(win, text="Save", command=save).grid(row=6, column=1, pady=5)
 
     def delete_incident(self):
         sel = self.inc_tree.selection()
         if not sel: return
-        iid = self.inc_tree.item(sel[0])['values'][0]
+        values = self.inc_tree.item(sel[0])['values']
+        iid, day = values[0], values[4]
         if not messagebox.askyesno("Confirm", "Delete selected incident?"): return
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("DELETE FROM Incidents WHERE incident_id=?", (iid,))
-        conn.commit(); conn.close()
-        self.load_incidents()
+        when_done(self, execute("DELETE FROM Incidents WHERE incident_id=?", (iid,)),
+                  lambda _: (self.load_incidents(), self.month_changed(day)))
+
+    def export_range(self):
+        # (start, end) for the chosen export scope; (None, None) = everything
+        scope = self.export_scope_var.get()
+        if scope == "Selected day":
+            day = self.calendar.get_date()
+            return day, next_day(day)
+        if scope == "Visible month":
+            month, year = self.calendar.get_displayed_month()
+            return month_bounds((year, month))
+        return None, None
 
     def export_inc_csv(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")])
         if not path: return
-        conn = self.db_connect(); c = conn.cursor()
-        c.execute("SELECT * FROM Incidents")
-        rows = c.fetchall()
-        with open(path, "w", newline="") as f:
-            import csv
-            w = csv.writer(f)
-            w.writerow([col[0] for col in c.description])
-            w.writerows(rows)
-        conn.close()
-        messagebox.showinfo("Export CSV", f"Exported {len(rows)} incidents to {path}")
+        when_done(self, db_read(write_csv, path, *incident_query(INCIDENT_COLUMNS, *self.export_range())),
+                  lambda n: messagebox.showinfo("Export CSV", f"Exported {n} incidents to {path}"),
+                  name="patrol.export_csv")
 
     def export_inc_pdf(self):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF","*.pdf")])
         if not path: return
-        c = canvas.Canvas(path, pagesize=letter)
-        width, height = letter
-        c.setFont("Helvetica", 14)
-        c.drawString(40, height - 40, "Incident Report")
-        y = height - 80
-        conn = self.db_connect(); cur = conn.cursor()
-        cur.execute("SELECT incident_id,shift_id,category,description,timestamp FROM Incidents")
-        for iid, sid, cat, desc, ts in cur.fetchall():
-            text = f"ID:{iid} | Shift:{sid} | {cat} | {desc[:30]} | {ts.split('T')[0]}"
-            c.drawString(40, y, text)
-            y -= 20
-            if y < 40:
-                c.showPage(); y = height - 40
-        conn.close(); c.save()
-        messagebox.showinfo("Export PDF", f"PDF saved to {path}")
+        run_pdf_report(self, incident_report(path, *self.export_range()))
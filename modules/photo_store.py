@@ -0,0 +1,83 @@
+import hashlib, os, shutil, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from modules.jobs import when_done
+
+# Content-addressed photo store: every file is kept once, at
+# images/<first 2 hex>/<sha256><ext>, and records hold the "<sha256><ext>" key.
+PHOTO_DIR = "images"
+CHUNK_SIZE = 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl: share extents copy-on-write (btrfs, xfs)
+
+_executor = None
+
+
+def photo_path(ref):
+    # Store key -> file path; older records hold a plain path, returned as-is
+    if not ref or os.sep in ref or '/' in ref:
+        return ref
+    return os.path.join(PHOTO_DIR, ref[:2], ref)
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _reflink(src, dest):
+    import fcntl  # POSIX only
+    with open(src, 'rb') as fr, open(dest, 'wb') as fw:
+        fcntl.ioctl(fw.fileno(), FICLONE, fr.fileno())
+
+
+def _place(src, dest):
+    # Reflink, else a chunked copy; never a hardlink, which would let later edits
+    # to the user's original change the stored bytes under their hash
+    try:
+        _reflink(src, dest)
+        return
+    except (ImportError, OSError):
+        if os.path.exists(dest):
+            os.remove(dest)
+    with open(src, 'rb') as fr, open(dest, 'wb') as fw:
+        shutil.copyfileobj(fr, fw, CHUNK_SIZE)
+
+
+def store_photo(src):
+    # Returns the store key for src, adding the file only if it is new
+    key = hash_file(src) + os.path.splitext(src)[1].lower()
+    dest = photo_path(key)
+    if os.path.exists(dest):
+        return key
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # Build under a temp name and rename, so a half-written file never has the key's name
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix='.part')
+    os.close(fd); os.remove(tmp)
+    try:
+        _place(src, tmp)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return key
+
+
+def store_photo_async(src):
+    # Hash and copy off the Tk thread; returns a Future of the store key
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(1, thread_name_prefix="photo-store")
+    return _executor.submit(store_photo, src)
+
+
+def with_photo_key(widget, pending, callback):
+    # callback(key) on the Tk thread once a store_photo_async() Future settles,
+    # so writes are submitted with the key instead of waiting for the copy on
+    # the writer thread. No photo, or a failed copy (already reported to the
+    # user), gives None: the record is saved without one.
+    if pending is None:
+        callback(None)
+    else:
+        when_done(widget, pending, callback, lambda e: callback(None))
@@ -0,0 +1,144 @@
+import csv, os, queue, threading
+from datetime import datetime
+from tkinter import messagebox
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from database import get_conn, close_conn, traced
+from modules.jobs import watch_job
+
+CHUNK_SIZE = 250  # rows fetched, and laid out as one table, at a time
+MARGIN = 0.5 * inch
+HEADER_HEIGHT = 0.75 * inch
+ROW_HEIGHT = 14
+
+TABLE_STYLE = TableStyle([
+    ('FONT', (0, 0), (-1, -1), 'Helvetica', 8),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
+    ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#cccccc')),
+])
+
+
+def write_csv(conn, path, sql, params):
+    # Runs on a DB reader thread (db_read); streams rows straight into the file
+    c = conn.execute(sql, params)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([d[0] for d in c.description])
+        n = 0
+        for rows in iter(lambda: c.fetchmany(1000), []):
+            writer.writerows(rows); n += len(rows)
+    return n
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+class _LazyFlowables(list):
+    # platypus consumes flowables from the front of a list until it is empty;
+    # refilling on demand means only one chunk of rows is in memory at a time.
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = chunks
+
+    def __len__(self):
+        if not list.__len__(self):
+            chunk = next(self._chunks, None)
+            if chunk is not None:
+                self.append(chunk)
+        return list.__len__(self)
+
+
+class PdfReport(threading.Thread):
+    # Streams a query into a paginated PDF table on a worker thread.
+    # columns: [(heading, relative width)]; format_row maps a result row to cells.
+    # Posts ("progress", fraction, text) then ("done", rows), ("cancelled", rows)
+    # or ("failed", message) to `messages`; set `cancelled` to stop early.
+    def __init__(self, path, title, columns, sql, params=(), format_row=None, chunk_size=CHUNK_SIZE):
+        super().__init__(daemon=True)
+        self.path, self.title, self.columns = path, title, columns
+        self.sql, self.params = sql, tuple(params)
+        self.format_row = format_row or (lambda row: row)
+        self.chunk_size = chunk_size
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+        self.rows_done = 0
+        self.total = 0
+        self.generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+    def run(self):
+        try:
+            with traced():
+                self._build()
+            self.messages.put(("done", self.rows_done))
+        except ReportCancelled:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.messages.put(("cancelled", self.rows_done))
+        except Exception as e:
+            self.messages.put(("failed", str(e)))
+        finally:
+            close_conn()
+
+    def _build(self):
+        conn = get_conn()
+        self.total = conn.execute(f"SELECT COUNT(*) FROM ({self.sql})", self.params).fetchone()[0]
+        doc = SimpleDocTemplate(self.path, pagesize=letter, title=self.title,
+                                leftMargin=MARGIN, rightMargin=MARGIN,
+                                topMargin=MARGIN + HEADER_HEIGHT, bottomMargin=MARGIN)
+        scale = doc.width / sum(w for _, w in self.columns)
+        self.col_widths = [w * scale for _, w in self.columns]
+        cur = conn.execute(self.sql, self.params)
+        doc.build(_LazyFlowables(self._tables(cur)),
+                  onFirstPage=self._draw_page, onLaterPages=self._draw_page)
+
+    def _tables(self, cur):
+        while True:
+            if self.cancelled.is_set():
+                raise ReportCancelled()
+            rows = cur.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            cells = [["" if v is None else str(v) for v in self.format_row(row)] for row in rows]
+            self.rows_done += len(rows)
+            self.messages.put(("progress", self.rows_done / max(self.total, 1),
+                               f"{self.rows_done} of {self.total} rows"))
+            yield Table(cells, colWidths=self.col_widths, rowHeights=ROW_HEIGHT, style=TABLE_STYLE)
+        if not self.rows_done:
+            yield Table([["No records."]], colWidths=[sum(self.col_widths)], style=TABLE_STYLE)
+
+    def _draw_page(self, canv, doc):
+        # Title, column headings and page number drawn on every page
+        width, height = doc.pagesize
+        top = height - MARGIN
+        canv.saveState()
+        canv.setFont('Helvetica-Bold', 14)
+        canv.drawString(MARGIN, top - 14, self.title)
+        canv.setFont('Helvetica', 8)
+        canv.drawRightString(width - MARGIN, top - 14, f"Generated {self.generated} - {self.total} rows")
+        y = top - HEADER_HEIGHT + 4
+        canv.setFillColor(colors.HexColor('#333333'))
+        canv.rect(MARGIN, y, doc.width, ROW_HEIGHT, stroke=0, fill=1)
+        canv.setFillColor(colors.white)
+        canv.setFont('Helvetica-Bold', 8)
+        x = MARGIN
+        for (heading, _), w in zip(self.columns, self.col_widths):
+            canv.drawString(x + 6, y + 4, heading)
+            x += w
+        canv.setFillColor(colors.black)
+        canv.setFont('Helvetica', 8)
+        canv.drawCentredString(width / 2, MARGIN / 2, f"Page {doc.page}")
+        canv.restoreState()
+
+
+def run_pdf_report(parent, report):
+    # Run a PdfReport behind a progress window and tell the user how it went
+    def finished(msg):
+        if msg[0] == "done":
+            messagebox.showinfo("Export PDF", f"PDF report with {msg[1]} rows saved to {report.path}")
+        elif msg[0] == "failed":
+            messagebox.showerror("Export PDF", f"PDF export failed: {msg[1]}")
+    watch_job(parent, report, f"Exporting {report.title}", finished)
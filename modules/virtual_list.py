@@ -0,0 +1,160 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from database import query
+from modules.jobs import when_done
+
+PAGE_SIZE = 200
+PREFETCH_AT = 0.9  # fetch the next page once the view scrolls past this fraction
+
+# COUNT(*) results keyed by (table, conditions, params); writers call
+# invalidate_counts(table) so the next list shows a fresh total.
+_count_cache = {}
+
+
+def invalidate_counts(table):
+    for key in [k for k in _count_cache if k[0] == table]:
+        del _count_cache[key]
+
+
+def page_query(table, key, columns, sort_index, descending, conditions, params, last_key, limit):
+    # (sql, params) for the page after last_key ([sort value, key] or None)
+    sort_expr = columns[sort_index][2]
+    direction, op = ("DESC", "<") if descending else ("ASC", ">")
+    conds, params = list(conditions), list(params)
+    if last_key is not None:
+        if sort_expr == key:
+            conds.append(f"{key} {op} ?"); params.append(last_key[1])
+        else:
+            conds.append(f"({sort_expr}, {key}) {op} (?, ?)"); params += last_key
+    sql = f"SELECT {', '.join(c[1] for c in columns)}, {sort_expr}, {key} FROM {table}"
+    if conds:
+        sql += " WHERE " + " AND ".join(f"({c})" for c in conds)
+    sql += f" ORDER BY {sort_expr} {direction}, {key} {direction} LIMIT ?"
+    return sql, params + [limit]
+
+
+class PagedTreeview(ttk.Frame):
+    # A Treeview fed by keyset-paged queries: only the first page is loaded up
+    # front and more are fetched as the user scrolls. Clicking a heading re-sorts
+    # in SQL. columns: [(heading, select expr, sort expr)]; sort exprs must be
+    # NULL-free (wrap nullable columns in IFNULL) for the keyset to be exact.
+    def __init__(self, parent, table, key, columns, sort=None, descending=False,
+                 tags=None, page_size=PAGE_SIZE, **tree_opts):
+        super().__init__(parent)
+        self.table, self.key, self.columns = table, key, columns
+        self.tags, self.page_size = tags, page_size
+        self.sort_index = [c[0] for c in columns].index(sort) if sort else 0
+        self.descending = descending
+        self.conditions, self.params = [], []
+        self._last_key = None
+        self._exhausted = False
+        self._loading = False
+        self._pending = False
+        self._shown = 0
+        self._generation = 0  # bumped by reload(); older page results are dropped
+
+        headings = [c[0] for c in columns]
+        self.tree = ttk.Treeview(self, columns=headings, show='headings', **tree_opts)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        for i, heading in enumerate(headings):
+            self.tree.heading(heading, text=heading, command=lambda i=i: self.sort_by(i))
+        self.status_var = tk.StringVar()
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        ttk.Label(self, textvariable=self.status_var, anchor='w').grid(row=1, column=0, sticky='ew')
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+    def set_filter(self, conditions, params):
+        self.conditions, self.params = list(conditions), list(params)
+        self.reload()
+
+    def show_rows(self, rows, conditions, params, status):
+        # Show a fixed result set (e.g. ranked search hits) instead of paging;
+        # conditions/params describe the same rows so a heading click can
+        # re-sort them in SQL.
+        self.conditions, self.params = list(conditions), list(params)
+        self.tree.delete(*self.tree.get_children())
+        self._generation += 1; self._loading = False
+        self._last_key, self._exhausted, self._shown = None, True, len(rows)
+        for i, (heading, _, _) in enumerate(self.columns):
+            self.tree.heading(heading, text=heading)
+        for values in rows:
+            self.tree.insert('', 'end', values=values, tags=self.tags(values) if self.tags else ())
+        self.status_var.set(status)
+
+    def sort_by(self, index):
+        if index == self.sort_index:
+            self.descending = not self.descending
+        else:
+            self.sort_index, self.descending = index, False
+        self.reload()
+
+    def reload(self):
+        self.tree.delete(*self.tree.get_children())
+        self._generation += 1; self._loading = False
+        self._last_key, self._exhausted, self._shown = None, False, 0
+        for i, (heading, _, _) in enumerate(self.columns):
+            arrow = (" ▼" if self.descending else " ▲") if i == self.sort_index else ""
+            self.tree.heading(heading, text=heading + arrow)
+        self.load_page()
+        # Counting can take a while on a big table; it runs after the first page
+        self.count()
+
+    def load_page(self):
+        if self._exhausted or self._loading:
+            return
+        self._loading = True
+        generation = self._generation
+        sql, params = page_query(self.table, self.key, self.columns, self.sort_index, self.descending,
+                                 self.conditions, self.params, self._last_key, self.page_size)
+
+        def loaded(rows):
+            if generation != self._generation:
+                return  # list was reloaded while this page was in flight
+            self._loading = False
+            for row in rows:
+                values = row[:-2]
+                self.tree.insert('', 'end', values=values, tags=self.tags(values) if self.tags else ())
+            self._shown += len(rows)
+            if rows:
+                self._last_key = list(rows[-1][-2:])
+            self._exhausted = len(rows) < self.page_size
+            self._update_status()
+
+        def failed(exc):
+            if generation == self._generation:
+                self._loading = False
+            messagebox.showerror("Database Error", str(exc))
+        when_done(self, query(sql, params), loaded, failed, name=f"{self.table}.load_page")
+
+    def count(self):
+        # COUNT(*) on a reader thread; the status line fills in when it lands
+        cache_key = (self.table, tuple(self.conditions), tuple(self.params))
+        if cache_key in _count_cache:
+            self._update_status()
+            return
+        sql = f"SELECT COUNT(*) FROM {self.table}"
+        if self.conditions:
+            sql += " WHERE " + " AND ".join(f"({c})" for c in self.conditions)
+
+        def counted(rows):
+            _count_cache[cache_key] = rows[0][0]
+            self._update_status()
+        when_done(self, query(sql, self.params), counted, name=f"{self.table}.count")
+
+    def _update_status(self):
+        cache_key = (self.table, tuple(self.conditions), tuple(self.params))
+        total = _count_cache.get(cache_key)
+        self.status_var.set(f"Showing {self._shown} of {total}" if total is not None else f"Showing {self._shown}")
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= PREFETCH_AT and not self._exhausted and not self._pending:
+            self._pending = True
+            self.after_idle(self._load_pending)
+
+    def _load_pending(self):
+        self._pending = False
+        self.load_page()
@@ -0,0 +1,127 @@
+import sqlite3
+
+import pytest
+
+from database import migrate
+from modules.clustering import (CLUSTER_MAX_ZOOM, Cluster, HazardClusterIndex, cell_bounds, cell_of,
+                                cell_range, expansion_zoom, mercator)
+from modules.hazard_map import extent_query, load_clusters
+
+ZOOM = 10
+# Around a mine site; at zoom 10 a cell is ~0.09 degrees of longitude
+SITE = (-23.70, 133.87)
+VIEW = (SITE[0] - 0.3, SITE[0] + 0.3, SITE[1] - 0.5, SITE[1] + 0.5)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "app.db")
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def add_hazards(conn, hazards):
+    # hazards: [(lat, lon, severity)] -> [(id, lat, lon, severity)]
+    rows = []
+    for lat, lon, sev in hazards:
+        hid = conn.execute("INSERT INTO Hazards(latitude,longitude,description,severity,status,date_reported) "
+                           "VALUES (?,?,'',?,'Logged','2024-01-01')", (lat, lon, sev)).lastrowid
+        rows.append((hid, lat, lon, sev))
+    conn.commit()
+    return rows
+
+
+def cell_hazards(index, hazards):
+    cells = {}
+    for hid, lat, lon, sev in hazards:
+        key = index.key_of(lat, lon)
+        if key:
+            cells.setdefault(key, []).append((hid, lat, lon, sev))
+    return cells
+
+
+def test_single_hazard_is_its_own_representative():
+    index = HazardClusterIndex(ZOOM, cell_range(ZOOM, VIEW))
+    index.add(7, SITE[0], SITE[1], "High")
+    (cl,) = index.cells.values()
+    assert (cl.count, cl.rep, cl.worst_severity, cl.position) == (1, 7, "High", SITE)
+
+
+def test_add_then_remove_restores_aggregates():
+    index = HazardClusterIndex(ZOOM, cell_range(ZOOM, VIEW))
+    index.add(1, SITE[0], SITE[1], "Low")
+    index.add(2, SITE[0] + 0.001, SITE[1], "Area Closed")
+    index.add(3, SITE[0], SITE[1] + 0.001, "Med")
+    (cl,) = index.cells.values()
+    assert cl.count == 3 and cl.worst_severity == "Area Closed"
+
+    index.remove(2, SITE[0] + 0.001, SITE[1], "Area Closed")
+    assert cl.count == 2 and cl.worst_severity == "Med"
+    assert cl.position == pytest.approx((SITE[0], SITE[1] + 0.0005))
+
+    # Down to one: the index can't tell which hazard is left, so rep is unknown
+    index.remove(1, SITE[0], SITE[1], "Low")
+    assert cl.count == 1 and cl.rep is None and cl.worst_severity == "Med"
+    index.remove(3, SITE[0], SITE[1] + 0.001, "Med")
+    assert index.cells == {}
+
+
+def test_hazards_outside_the_cells_are_ignored():
+    index = HazardClusterIndex(ZOOM, cell_range(ZOOM, VIEW))
+    index.add(1, SITE[0] + 5, SITE[1], "Low")
+    index.remove(1, SITE[0] + 5, SITE[1], "Low")
+    assert index.cells == {} and index.key_of(SITE[0] + 5, SITE[1]) is None
+
+
+def test_sql_aggregates_match_the_index_cells(conn):
+    hazards = add_hazards(conn, [(SITE[0] + dy * 0.013, SITE[1] + dx * 0.017, sev)
+                                 for dy in range(-20, 21) for dx in range(-25, 26)
+                                 for sev in (("High",) if (dx + dy) % 3 else ("Low", None))])
+    cells = cell_range(ZOOM, VIEW)
+    index = load_clusters(conn, ZOOM, cells, [], [])
+    expected = cell_hazards(index, hazards)
+    assert set(index.cells) == set(expected)
+    for key, members in expected.items():
+        cl = index.cells[key]
+        assert cl.count == len(members)
+        assert cl.position == pytest.approx((sum(m[1] for m in members) / len(members),
+                                             sum(m[2] for m in members) / len(members)))
+        assert cl.worst_severity == ("High" if any(m[3] == "High" for m in members) else "Low")
+        if len(members) == 1:
+            assert cl.rep == members[0][0]
+
+
+def test_sql_aggregates_apply_the_filters(conn):
+    add_hazards(conn, [(SITE[0], SITE[1], "High"), (SITE[0], SITE[1] + 0.001, "Low")])
+    index = load_clusters(conn, ZOOM, cell_range(ZOOM, VIEW), ["severity = ?"], ["Low"])
+    (cl,) = index.cells.values()
+    assert (cl.count, cl.worst_severity, cl.rep) == (1, "Low", 2)
+
+
+def test_cell_bounds_cover_exactly_the_cell_range():
+    cells = cell_range(ZOOM, VIEW)
+    assert cell_range(ZOOM, cell_bounds(ZOOM, *cells))[:2] == cells[:2]
+    min_lat, max_lat, min_lon, max_lon = cell_bounds(ZOOM, *cells)
+    inside = cell_of(*mercator(min_lat + 1e-9, max_lon - 1e-9), ZOOM)
+    assert inside == cells[2:]
+
+
+def test_expansion_zoom_is_the_first_level_that_splits(conn):
+    a, b = (SITE[0], SITE[1]), (SITE[0], SITE[1] + 0.01)
+    add_hazards(conn, [a + ("Low",), b + ("Low",)])
+    split = next(z for z in range(CLUSTER_MAX_ZOOM + 1)
+                 if cell_of(*mercator(*a), z) != cell_of(*mercator(*b), z))
+    zoom = split - 3
+    key = cell_of(*mercator(*a), zoom)
+    extent = conn.execute(*extent_query(zoom, key, [], [])).fetchone()
+    assert extent == (SITE[0], SITE[0], SITE[1], SITE[1] + 0.01)
+    assert expansion_zoom(zoom, extent) == split
+    # Stacked on one spot: they never split, so zoom past the clustered levels
+    assert expansion_zoom(zoom, (SITE[0], SITE[0], SITE[1], SITE[1])) == CLUSTER_MAX_ZOOM + 1
+
+
+def test_cluster_from_sql_rows_keeps_severity_counts():
+    cl = Cluster(5, 1.0, 2.0, "Low")
+    cl.add(3.0, 4.0, "High", count=2)
+    assert cl.count == 3 and cl.severities == {"Low": 1, "High": 2} and cl.worst_severity == "High"
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from database import migrate
+from modules.inventory import StockError, check_out_batch, return_batch
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "app.db")
+    migrate(conn)
+    conn.executemany("INSERT INTO Items(item_id,name,quantity,threshold) VALUES (?,?,?,1)",
+                     [(1, "Radio", 5), (2, "Gas monitor", 1), (3, "Harness", None)])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def write(conn, fn, *args):
+    # As database.db_write runs a job: one transaction, rolled back on error
+    with conn:
+        return fn(conn, *args)
+
+
+def stock(conn):
+    return dict(conn.execute("SELECT item_id, quantity FROM Items"))
+
+
+def transactions(conn):
+    return conn.execute("SELECT item_id, person, status FROM Transactions ORDER BY transaction_id").fetchall()
+
+
+def test_check_out_batch_takes_every_line(conn):
+    write(conn, check_out_batch, {1: 2, 2: 1}, "Sam", "2024-02-01", "")
+    assert stock(conn) == {1: 3, 2: 0, 3: None}
+    assert transactions(conn) == [(1, "Sam", "out"), (1, "Sam", "out"), (2, "Sam", "out")]
+
+
+@pytest.mark.parametrize("lines", [{1: 2, 2: 2}, {1: 1, 3: 1}, {2: 1, 99: 1}])
+def test_check_out_batch_rolls_back_when_a_line_is_short(conn, lines):
+    # Short stock, a non-numeric quantity, an unknown item: nothing is taken
+    with pytest.raises(StockError):
+        write(conn, check_out_batch, lines, "Sam", "2024-02-01", "")
+    assert stock(conn) == {1: 5, 2: 1, 3: None}
+    assert transactions(conn) == []
+
+
+def test_single_check_out_cannot_go_below_zero(conn):
+    write(conn, check_out_batch, {2: 1}, "Sam", "", "")
+    with pytest.raises(StockError, match="Gas monitor"):
+        write(conn, check_out_batch, {2: 1}, "Lee", "", "")
+    assert stock(conn)[2] == 0 and len(transactions(conn)) == 1
+
+
+def test_return_batch_closes_the_oldest_check_outs(conn):
+    write(conn, check_out_batch, {1: 2}, "Sam", "", "")
+    write(conn, check_out_batch, {1: 1}, "Lee", "", "")
+    write(conn, return_batch, {1: 1}, "Lee", "")
+    write(conn, return_batch, {1: 1}, "", "")
+    assert stock(conn)[1] == 4
+    assert transactions(conn) == [(1, "Sam", "returned"), (1, "Sam", "out"), (1, "Lee", "returned")]
+
+
+def test_return_batch_rolls_back_when_a_line_is_not_out(conn):
+    write(conn, check_out_batch, {1: 2, 2: 1}, "Sam", "", "")
+    with pytest.raises(StockError, match="to Lee"):
+        write(conn, return_batch, {1: 1}, "Lee", "")
+    with pytest.raises(StockError, match="Only 1"):
+        write(conn, return_batch, {1: 2, 2: 2}, "Sam", "")
+    assert stock(conn) == {1: 3, 2: 0, 3: None}
+    assert [t[2] for t in transactions(conn)] == ["out", "out", "out"]